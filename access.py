@@ -0,0 +1,47 @@
+STAFF_ROLE_IDS = frozenset({1400926292043628656, 1401996403382816901, 1406684082196185189, 1401555224233246811})
+HOSTER_ADMIN_ROLE_IDS = frozenset({1401996403382816901, 1406684082196185189, 1401555224233246811})
+MOD_ROLE_ID = 1401555224233246811
+
+# gate -> (fixed role ids, or None to use the guild's role_permissions rule; fallback guild permission)
+GATES = {
+    'tlr': (None, 'manage_channels'),
+    'staff': (STAFF_ROLE_IDS, 'administrator'),
+    'hoster_admin': (HOSTER_ADMIN_ROLE_IDS, 'administrator'),
+    'ticket_mod': (frozenset({MOD_ROLE_ID}), 'administrator'),
+}
+
+class GuildAccess:
+    def __init__(self, role_permissions):
+        admin_roles = frozenset(role_permissions.get('adr', ()))
+        # 'adr' roles pass every rule, so fold them in once at compile time.
+        self.rules = {permission: frozenset(role_ids) | admin_roles for permission, role_ids in role_permissions.items()}
+        self.admin_roles = admin_roles
+        self.decisions = {}
+
+    def rule_roles(self, permission_type):
+        return self.rules.get(permission_type, self.admin_roles)
+
+    def _decide(self, member, key, compute):
+        decisions = self.decisions.get(member.id)
+        if decisions is None:
+            decisions = self.decisions[member.id] = {}
+        if key not in decisions:
+            decisions[key] = compute()
+        return decisions[key]
+
+    def allows(self, member, gate):
+        fixed_roles, fallback = GATES[gate]
+        allowed = self.rule_roles(gate) if fixed_roles is None else fixed_roles
+
+        def compute():
+            if not allowed.isdisjoint(role.id for role in member.roles):
+                return True
+            return getattr(member.guild_permissions, fallback)
+
+        return self._decide(member, gate, compute)
+
+    def invalidate_member(self, user_id):
+        self.decisions.pop(user_id, None)
+
+    def invalidate(self):
+        self.decisions.clear()
@@ -0,0 +1,58 @@
+import asyncio
+import functools
+
+import discord
+from discord.ext import commands
+
+class GuildActors:
+    def __init__(self, idle_timeout=60):
+        self.idle_timeout = idle_timeout
+        self.queues = {}
+
+    def __len__(self):
+        return len(self.queues)
+
+    async def run(self, guild_id, func, *args, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.get(guild_id)
+        if queue is None:
+            queue = self.queues[guild_id] = asyncio.Queue()
+            asyncio.create_task(self._worker(guild_id, queue))
+        queue.put_nowait((func, args, kwargs, future))
+        return await future
+
+    async def _worker(self, guild_id, queue):
+        try:
+            while True:
+                try:
+                    func, args, kwargs, future = await asyncio.wait_for(queue.get(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    # A job can be put on the same tick the timeout fires,
+                    # before this worker gets to run again.
+                    if queue.empty():
+                        break
+                    continue
+                if future.cancelled():
+                    continue
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+        finally:
+            del self.queues[guild_id]
+
+    def serialize(self, func):
+        # Handlers for the same guild run one at a time, in arrival order.
+        # Must not be stacked: a serialized handler awaiting another one for
+        # the same guild would wait on itself.
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            source = next(arg for arg in args if isinstance(arg, (commands.Context, discord.Interaction)))
+            if source.guild is None:
+                return await func(*args, **kwargs)
+            return await self.run(source.guild.id, func, *args, **kwargs)
+        return wrapper
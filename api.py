@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import json
+
+from aiohttp import web
+
+from metrics import registry
+
+stream_clients = registry.gauge("dash_sse_clients", "Connected tournament event streams.")
+stream_drops = registry.counter("dash_sse_dropped_total", "Event streams dropped for falling behind.")
+
+class Snapshot:
+    # Serialized once per tournament version and shared by every request
+    # until the next change replaces it.
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, data):
+        self.body = json.dumps(data, separators=(',', ':')).encode()
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=12).hexdigest() + '"'
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    for tag in header.split(','):
+        tag = tag.strip()
+        # If-None-Match compares weakly.
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+    return False
+
+def encode_event(event, data, event_id=None):
+    # Compact JSON never contains a raw newline, so it fits on one data line.
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+class TournamentAPI:
+    def __init__(self, app, snapshot, max_queued=64, max_clients=1000, heartbeat=15, write_timeout=10):
+        # snapshot(guild_id) returns the guild's current Snapshot, or None if
+        # the bot isn't in that guild.
+        self.snapshot = snapshot
+        self.max_queued = max_queued
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        self.write_timeout = write_timeout
+        # guild id -> queues of the streams watching it
+        self.streams = {}
+        self.clients = 0
+        app.router.add_get('/guilds/{guild_id}/tournament', self.tournament)
+        app.router.add_get('/guilds/{guild_id}/events', self.events)
+
+    def guild_id(self, request):
+        try:
+            return int(request.match_info['guild_id'])
+        except ValueError:
+            raise web.HTTPNotFound()
+
+    async def tournament(self, request):
+        snapshot = self.snapshot(self.guild_id(request))
+        if snapshot is None:
+            raise web.HTTPNotFound()
+
+        headers = {
+            'ETag': snapshot.etag,
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'ETag'
+        }
+        if etag_matches(request.headers.get('If-None-Match'), snapshot.etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=snapshot.body, content_type='application/json', headers=headers)
+
+    def watched(self, guild_id):
+        return guild_id in self.streams
+
+    def publish(self, guild_id, event, data, event_id=None):
+        queues = self.streams.get(guild_id)
+        if not queues:
+            return
+        # Encoded once; every stream gets the same bytes.
+        message = encode_event(event, data, event_id)
+        for queue in list(queues):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.drop(guild_id, queue)
+
+    def subscribe(self, guild_id, queue):
+        self.streams.setdefault(guild_id, set()).add(queue)
+        self.clients += 1
+        stream_clients.set(self.clients)
+
+    def unsubscribe(self, guild_id, queue):
+        queues = self.streams.get(guild_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.streams[guild_id]
+        self.clients -= 1
+        stream_clients.set(self.clients)
+
+    def drop(self, guild_id, queue):
+        # A full queue means the client stopped keeping up. Publishing never
+        # waits on it: its backlog goes and the stream is told to close.
+        self.unsubscribe(guild_id, queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+        stream_drops.inc()
+
+    async def events(self, request):
+        guild_id = self.guild_id(request)
+        if self.snapshot(guild_id) is None:
+            raise web.HTTPNotFound()
+        if self.clients >= self.max_clients:
+            raise web.HTTPServiceUnavailable()
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*',
+            'X-Accel-Buffering': 'no'
+        })
+        await response.prepare(request)
+
+        # Subscribing and taking the snapshot in the same step means no delta
+        # can fall between the two.
+        queue = asyncio.Queue(self.max_queued)
+        self.subscribe(guild_id, queue)
+        snapshot = self.snapshot(guild_id)
+        try:
+            if snapshot is not None:
+                await asyncio.wait_for(response.write(b"event: snapshot\ndata: " + snapshot.body + b"\n\n"), self.write_timeout)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    message = b": ping\n\n"
+                if message is None:
+                    break
+                await asyncio.wait_for(response.write(message), self.write_timeout)
+        except (ConnectionResetError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.unsubscribe(guild_id, queue)
+        return response
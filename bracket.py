@@ -0,0 +1,96 @@
+def entry_ids(entry):
+    if isinstance(entry, (list, tuple)):
+        return [player.id for player in entry]
+    return [entry.id]
+
+class Bracket:
+    # Single-elimination winner tree stored heap-style in one flat list:
+    # leaves (round 1 entrants) sit at size..2*size-1 and the winner of the
+    # match between nodes 2n and 2n+1 is written to node n, so node 1 ends up
+    # holding the champion.
+    def __init__(self, entrants):
+        size = len(entrants)
+        if size < 2 or size & (size - 1):
+            raise ValueError("Bracket size must be a power of two")
+
+        self.size = size
+        self.rounds_total = size.bit_length() - 1
+        self.tree = [None] * size + list(entrants)
+        self.losers = [None] * size
+        self.reported_at = [0] * size
+        self.reports = []
+        self.position = {}
+        for node in range(size, 2 * size):
+            for player_id in entry_ids(self.tree[node]):
+                self.position[player_id] = node
+        self.round = 1
+        self.pending = size // 2
+
+    @property
+    def entrants(self):
+        return self.tree[self.size:]
+
+    @property
+    def finished(self):
+        return self.tree[1] is not None
+
+    @property
+    def champion(self):
+        return self.tree[1]
+
+    def node(self, round_number, index):
+        return (self.size >> round_number) + index
+
+    def round_of(self, node):
+        return self.rounds_total - (node.bit_length() - 1)
+
+    def match_count(self, round_number):
+        return self.size >> round_number
+
+    def matches(self, round_number, start=0, stop=None):
+        first = self.size >> round_number
+        stop = first if stop is None else stop
+        return [(self.tree[2 * node], self.tree[2 * node + 1]) for node in range(first + start, first + stop)]
+
+    def winner(self, round_number, index):
+        return self.tree[self.node(round_number, index)]
+
+    def match_of(self, player_id):
+        # Returns (round, index) of the match the player is currently due to
+        # play, or None if they are not in the bracket.
+        node = self.position.get(player_id)
+        if node is None:
+            return None
+        match = node >> 1
+        round_number = self.round_of(match)
+        return round_number, match - (self.size >> round_number)
+
+    def report(self, player_id):
+        node = self.position[player_id]
+        match = node >> 1
+        if self.round_of(match) != self.round or self.tree[match] is not None:
+            raise ValueError("Match is not open for reporting")
+
+        winner = self.tree[node]
+        self.tree[match] = winner
+        self.losers[match] = self.tree[node ^ 1]
+        self.reports.append(player_id)
+        self.reported_at[match] = len(self.reports)
+        for winner_id in entry_ids(winner):
+            self.position[winner_id] = match
+
+        self.pending -= 1
+        if self.pending == 0 and match != 1:
+            self.round += 1
+            self.pending = self.match_count(self.round)
+        return match
+
+    def placements(self):
+        if not self.finished:
+            return []
+        placements = [(1, self.tree[1]), (2, self.losers[1])]
+        if self.size >= 4:
+            # No third-place match: the later semi-final loser is listed third.
+            semis = sorted((2, 3), key=lambda node: self.reported_at[node], reverse=True)
+            placements.extend((place, self.losers[node]) for place, node in zip((3, 4), semis))
+        return placements
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import multiprocessing
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+ROW = 18
+GAP = 8
+BOX = 220
+COLUMN = 260
+MARGIN = 20
+LABEL_CHARS = 34
+# Past this many matches in the first drawn round the image stops being
+# readable (and gets expensive), so those rounds go out without one.
+MAX_MATCHES = 128
+
+BACKGROUND = (32, 34, 37)
+LINE = (114, 118, 125)
+TEXT = (220, 221, 222)
+WINNER = (87, 242, 135)
+LOSER = (128, 132, 142)
+
+EMOJI = re.compile(r"<a?:(\w+):\d+>")
+
+def plain(text):
+    # Custom emoji can't be drawn, so they show as :name: instead.
+    text = EMOJI.sub(r":\1:", text)
+    return text if len(text) <= LABEL_CHARS else text[:LABEL_CHARS - 1] + "…"
+
+def render_bracket(title, rounds, champion):
+    # rounds[c] holds (label_a, label_b, winner) for every match in column c,
+    # winner being 0, 1 or None. Runs in a worker process and returns PNG bytes.
+    first = len(rounds[0])
+    width = MARGIN * 2 + COLUMN * len(rounds) + BOX
+    height = MARGIN * 3 + ROW + first * (2 * ROW + GAP)
+    image = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    draw.text((MARGIN, MARGIN), plain(title), fill=TEXT, font=font)
+    top = MARGIN * 2 + ROW
+    centers = [top + index * (2 * ROW + GAP) + ROW for index in range(first)]
+
+    for column, matches in enumerate(rounds):
+        x = MARGIN + column * COLUMN
+        for (label_a, label_b, winner), center in zip(matches, centers):
+            for slot, label in enumerate((label_a, label_b)):
+                y = center - ROW + slot * ROW
+                colour = TEXT if winner is None else WINNER if winner == slot else LOSER
+                draw.rectangle((x, y, x + BOX, y + ROW - 1), outline=LINE)
+                draw.text((x + 4, y + 3), plain(label), fill=colour, font=font)
+            draw.line((x + BOX, center, x + BOX + 20, center), fill=LINE)
+
+        joined = []
+        for upper, lower in zip(centers[0::2], centers[1::2]):
+            middle = (upper + lower) // 2
+            draw.line((x + BOX + 20, upper, x + BOX + 20, lower), fill=LINE)
+            draw.line((x + BOX + 20, middle, x + COLUMN, middle), fill=LINE)
+            joined.append(middle)
+        centers = joined or centers
+
+    x = MARGIN + len(rounds) * COLUMN
+    y = centers[0] - ROW // 2
+    draw.rectangle((x, y, x + BOX, y + ROW - 1), outline=WINNER)
+    draw.text((x + 4, y + 3), plain(champion or "?"), fill=WINNER, font=font)
+
+    output = io.BytesIO()
+    image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+class BracketImages:
+    def __init__(self, max_cached=32, workers=1):
+        self.max_cached = max_cached
+        self.workers = workers
+        self.executor = None
+        # (title, rounds, champion) -> future, so a render already in flight
+        # is shared rather than started again.
+        self.cache = OrderedDict()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    async def render(self, title, rounds, champion=None):
+        if not self.available or len(rounds[0]) > MAX_MATCHES:
+            return None
+
+        key = (title, rounds, champion)
+        future = self.cache.get(key)
+        if future is None:
+            if self.executor is None:
+                # By now the bot runs the persistence and watchdog threads;
+                # forking it could hand a worker a lock some thread held.
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            future = asyncio.get_running_loop().run_in_executor(self.executor, render_bracket, title, rounds, champion)
+            self.cache[key] = future
+            if len(self.cache) > self.max_cached:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+
+        try:
+            return await asyncio.shield(future)
+        except Exception as e:
+            print(f"Error rendering bracket image: {e}")
+            self.cache.pop(key, None)
+            return None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,40 @@
+import asyncio
+
+import discord
+
+class DMReport:
+    def __init__(self, outcomes):
+        # (recipient, None on success or the reason it failed), in send order.
+        self.outcomes = outcomes
+
+    @property
+    def sent(self):
+        return [recipient for recipient, error in self.outcomes if error is None]
+
+    @property
+    def failed(self):
+        return [(recipient, error) for recipient, error in self.outcomes if error is not None]
+
+    def describe_failures(self):
+        return ", ".join(f"{getattr(recipient, 'name', recipient)} ({error})" for recipient, error in self.failed)
+
+class DMDispatcher:
+    def __init__(self, concurrency=5):
+        # discord.py already waits out 429s per route; the semaphore keeps a
+        # large fan-out from piling onto the global limit while it does.
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _send(self, recipient, content, kwargs):
+        async with self.semaphore:
+            try:
+                await recipient.send(content, **kwargs)
+            except discord.Forbidden:
+                return recipient, "DMs disabled"
+            except discord.HTTPException as e:
+                return recipient, f"send failed: {e.status}"
+            return recipient, None
+
+    async def send(self, messages):
+        # messages is a list of (recipient, content) or (recipient, content, kwargs).
+        sends = [self._send(recipient, content, extra[0] if extra else {}) for recipient, content, *extra in messages]
+        return DMReport(list(await asyncio.gather(*sends)))
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+
+from access import GuildAccess
+from render import GuildRenders
+
+class GuildState:
+    def __init__(self, guild_id, tournament, role_permissions, log_channel, bracket_roles, teams, bracket_roles_messages=None):
+        self.guild_id = guild_id
+        self.tournament = tournament
+        self.role_permissions = role_permissions
+        self.access = GuildAccess(role_permissions)
+        self.log_channel = log_channel
+        self.bracket_roles = bracket_roles
+        # (channel id, message ids) of the bracket roles log, one message per page.
+        self.bracket_roles_messages = bracket_roles_messages
+        self.teams = teams
+        self.renders = GuildRenders()
+        self.last_used = time.monotonic()
+
+class GuildStateCache:
+    def __init__(self, load, unload, max_resident=1000, idle_timeout=1800, min_idle=60):
+        self.load = load
+        self.unload = unload
+        self.max_resident = max_resident
+        self.idle_timeout = idle_timeout
+        self.min_idle = min_idle
+        self.states = OrderedDict()
+        # Evicted states stay reachable until their writes are on disk, so a
+        # guild that comes straight back never reloads stale rows.
+        self.unloading = {}
+
+    def __len__(self):
+        return len(self.states)
+
+    def __iter__(self):
+        return iter(self.states.values())
+
+    def peek(self, guild_id):
+        return self.states.get(guild_id) or self.unloading.get(guild_id)
+
+    def get(self, guild_id):
+        state = self.states.get(guild_id)
+        if state is not None:
+            self.states.move_to_end(guild_id)
+        else:
+            state = self.unloading.pop(guild_id, None) or self.load(guild_id)
+            self.states[guild_id] = state
+            self.evict_over_capacity()
+
+        state.last_used = time.monotonic()
+        return state
+
+    def evict(self, guild_id):
+        state = self.states.pop(guild_id)
+        self.unload(state)
+        self.unloading[guild_id] = state
+
+    def evict_over_capacity(self):
+        now = time.monotonic()
+        # A guild used in the last min_idle seconds may still be mid-command,
+        # so the cap is allowed to overshoot rather than evict it.
+        while len(self.states) > self.max_resident:
+            guild_id, state = next(iter(self.states.items()))
+            if now - state.last_used < self.min_idle:
+                break
+            self.evict(guild_id)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        while self.states:
+            guild_id, state = next(iter(self.states.items()))
+            if now - state.last_used < self.idle_timeout:
+                break
+            self.evict(guild_id)
+        self.evict_over_capacity()
+
+    def forget_unloaded(self, evicted):
+        # Returns the guilds actually dropped; one revived in the meantime
+        # is resident again and keeps its state.
+        forgotten = []
+        for guild_id, state in evicted.items():
+            if self.unloading.get(guild_id) is state:
+                del self.unloading[guild_id]
+                forgotten.append(guild_id)
+        return forgotten
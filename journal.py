@@ -0,0 +1,114 @@
+import json
+
+import discord
+
+from tournament import Tournament, FakePlayer
+from registration import Registration
+from bracket import Bracket
+
+def encode(value):
+    if isinstance(value, FakePlayer):
+        return {'fake': value.id, 'name': value.name}
+    if isinstance(value, (discord.Member, discord.User, discord.Object)):
+        return {'member': value.id}
+    if isinstance(value, (discord.Message, discord.PartialMessage)):
+        return {'message': value.id, 'channel': value.channel.id}
+    if isinstance(value, (discord.abc.GuildChannel, discord.Thread)):
+        return {'channel': value.id}
+    if isinstance(value, Registration):
+        return {'registration': [[key, encode(list(players))] for key, players in value.entries.items()]}
+    if isinstance(value, Bracket):
+        return {'bracket': encode(value.entrants), 'reports': value.reports}
+    if isinstance(value, tuple):
+        return {'pair': [encode(v) for v in value]}
+    if isinstance(value, list):
+        return [encode(v) for v in value]
+    if isinstance(value, dict):
+        return {'map': {k: encode(v) for k, v in value.items()}}
+    return value
+
+def decode(value, get_member, get_channel):
+    if isinstance(value, list):
+        return [decode(v, get_member, get_channel) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if 'fake' in value:
+        return FakePlayer(value['name'], value['fake'])
+    if 'member' in value:
+        return get_member(value['member'])
+    if 'message' in value:
+        channel = get_channel(value['channel'])
+        return channel.get_partial_message(value['message']) if channel else None
+    if 'channel' in value:
+        return get_channel(value['channel'])
+    if 'registration' in value:
+        registration = Registration()
+        for key, players in value['registration']:
+            registration.add(key, decode(players, get_member, get_channel))
+        return registration
+    if 'bracket' in value:
+        bracket = Bracket(decode(value['bracket'], get_member, get_channel))
+        for player_id in value['reports']:
+            bracket.report(player_id)
+        return bracket
+    if 'pair' in value:
+        return tuple(decode(v, get_member, get_channel) for v in value['pair'])
+    return {k: decode(v, get_member, get_channel) for k, v in value['map'].items()}
+
+class TournamentJournal:
+    def __init__(self, store, snapshot_every=25):
+        self.store = store
+        self.snapshot_every = snapshot_every
+        self.seqs = {}
+        self.since_snapshot = {}
+
+    def record(self, guild_id, tournament, event, data):
+        if event in ('created', 'reset'):
+            # Nothing before a create/reset is needed to rebuild the bracket.
+            self.store.clear_tournament(guild_id)
+            self.since_snapshot[guild_id] = 0
+            if event == 'reset':
+                return
+
+        seq = self.seqs.get(guild_id, 0) + 1
+        self.seqs[guild_id] = seq
+        self.store.append_tournament_event(guild_id, seq, event, json.dumps(encode(data)))
+
+        self.since_snapshot[guild_id] = self.since_snapshot.get(guild_id, 0) + 1
+        if self.since_snapshot[guild_id] >= self.snapshot_every:
+            self.snapshot(guild_id, tournament)
+
+    def snapshot(self, guild_id, tournament):
+        if not self.since_snapshot.get(guild_id):
+            return
+        state = {name: value for name, value in vars(tournament).items() if name != 'version'}
+        self.store.save_tournament_snapshot(guild_id, self.seqs[guild_id], json.dumps(encode(state)))
+        self.since_snapshot[guild_id] = 0
+
+    def load(self, guild_id, get_member, get_channel):
+        tournament, seq, replayed = self.read(guild_id, get_member, get_channel)
+        self.seqs[guild_id] = seq
+        self.since_snapshot[guild_id] = replayed
+        return tournament
+
+    def read(self, guild_id, get_member, get_channel):
+        # Rebuilds the tournament without taking over its sequence numbers.
+        snapshot, events = self.store.load_tournament_journal(guild_id)
+        member = lambda user_id: get_member(guild_id, user_id)
+        tournament = Tournament()
+        seq = 0
+        try:
+            if snapshot:
+                seq, state = snapshot
+                vars(tournament).update(decode(json.loads(state), member, get_channel))
+            for seq, event, payload in events:
+                tournament.apply(event, decode(json.loads(payload), member, get_channel))
+        except Exception as e:
+            # A journal this version can't replay shouldn't lock the guild out.
+            print(f"Error recovering tournament for guild {guild_id}: {e}")
+            tournament = Tournament()
+        return tournament, seq, len(events)
+
+    def forget(self, guild_id):
+        self.seqs.pop(guild_id, None)
+        self.since_snapshot.pop(guild_id, None)
@@ -1,16 +1,50 @@
-from flask import Flask
-from threading import Thread
+import math
 
-app = Flask('')
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return "Botul merge!"
+from metrics import registry
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+class WebServer:
+    # Served from the bot's own event loop, so handlers can read bot state
+    # directly. Routes have to be added to app before start().
+    def __init__(self, bot, host='0.0.0.0', port=8080):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/healthz', self.healthz)
+        self.app.router.add_get('/metrics', self.metrics)
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
-  
+    async def start(self):
+        if self.runner is not None:
+            return
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        print(f"✅ HTTP server listening on {self.host}:{self.port}")
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def home(self, request):
+        return web.Response(text="Botul merge!")
+
+    async def healthz(self, request):
+        # latency is nan before the first connect and inf until the first
+        # heartbeat ack, neither of which is healthy.
+        latency = self.bot.latency
+        connected = math.isfinite(latency)
+        ready = self.bot.is_ready() and not self.bot.is_closed()
+        body = {
+            'ready': ready,
+            'latency_ms': round(latency * 1000, 1) if connected else None,
+            'guilds': len(self.bot.guilds) if ready else 0
+        }
+        return web.json_response(body, status=200 if ready and connected else 503)
+
+    async def metrics(self, request):
+        return web.Response(body=registry.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
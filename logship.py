@@ -0,0 +1,74 @@
+import asyncio
+from collections import deque
+
+# Discord allows 10 embeds per message and 6000 characters across them.
+MESSAGE_EMBEDS = 10
+MESSAGE_CHARS = 6000
+
+
+class LogShipper:
+    def __init__(self, send, delay=2.0, max_buffered=500):
+        # send(channel_id, embeds) is awaited once per packed message.
+        self.send = send
+        self.delay = delay
+        self.max_buffered = max_buffered
+        self.buffers = {}
+        self.buffered = 0
+        self.dropped = 0
+        self._handle = None
+        self._task = None
+
+    def __len__(self):
+        return self.buffered
+
+    def put(self, channel_id, embed):
+        if self.buffered >= self.max_buffered:
+            # Logs are best-effort: under a flood the oldest entry of the
+            # busiest channel goes, never the command that produced it.
+            busiest = max(self.buffers.values(), key=len)
+            busiest.popleft()
+            self.buffered -= 1
+            self.dropped += 1
+
+        self.buffers.setdefault(channel_id, deque()).append(embed)
+        self.buffered += 1
+        if self._handle is None and self._task is None:
+            self._handle = asyncio.get_running_loop().call_later(self.delay, self._flush)
+
+    def _flush(self):
+        self._handle = None
+        self._task = asyncio.create_task(self._ship())
+
+    async def _ship(self):
+        try:
+            if self.dropped:
+                print(f"Log buffer full, dropped {self.dropped} log entries")
+                self.dropped = 0
+
+            buffers = self.buffers
+            self.buffers = {}
+            self.buffered = 0
+            await asyncio.gather(*(self._ship_channel(channel_id, embeds) for channel_id, embeds in buffers.items()))
+        finally:
+            self._task = None
+            if self.buffered:
+                self._handle = asyncio.get_running_loop().call_later(self.delay, self._flush)
+
+    async def _ship_channel(self, channel_id, embeds):
+        batch = []
+        size = 0
+        for embed in embeds:
+            if batch and (len(batch) == MESSAGE_EMBEDS or size + len(embed) > MESSAGE_CHARS):
+                await self._send(channel_id, batch)
+                batch = []
+                size = 0
+            batch.append(embed)
+            size += len(embed)
+        if batch:
+            await self._send(channel_id, batch)
+
+    async def _send(self, channel_id, batch):
+        try:
+            await self.send(channel_id, batch)
+        except Exception as e:
+            print(f"Error logging command: {e}")
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from metrics import registry
+
+loop_stalls = registry.counter("dash_event_loop_stalls_total", "Times the event loop was blocked past the watchdog threshold.")
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class LoopWatchdog:
+    # A coroutine on the loop stamps a heartbeat; a side thread checks it and,
+    # once the loop has gone quiet for longer than threshold, dumps whatever
+    # the loop thread is executing right then.
+    def __init__(self, threshold=0.5, interval=0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self.last_beat = time.monotonic()
+        self.loop = None
+        self.loop_thread_id = None
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None or self.threshold <= 0:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.loop.create_task(self._beat())
+        self.thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    async def _beat(self):
+        while True:
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported = None
+        while True:
+            time.sleep(self.interval)
+            beat = self.last_beat
+            lag = time.monotonic() - beat - self.interval
+            # One report per stall: the same heartbeat stays stale until the
+            # loop gets going again.
+            if lag > self.threshold and reported != beat:
+                reported = beat
+                self.report(lag)
+
+    def report(self, lag):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        # Drop the loop machinery: what matters starts after the last
+        # Handle._run, i.e. at the callback or task step being run.
+        starts = [i for i, entry in enumerate(stack) if entry.filename.endswith(os.path.join('asyncio', 'events.py'))]
+        if starts:
+            stack = stack[starts[-1] + 1:]
+        task = asyncio.current_task(self.loop)
+        task_name = task.get_name() if task is not None else "no task"
+        # The outermost frame in the bot's own code is the handler that
+        # started the blocking work.
+        own = [entry for entry in stack if entry.filename.startswith(PROJECT_DIR)]
+        handler = f"{own[0].name} ({os.path.basename(own[0].filename)}:{own[0].lineno})" if own else "unknown"
+
+        loop_stalls.inc()
+        print(f"⚠️ Event loop blocked for {lag:.3f}s in {handler}, task {task_name}\n" + "".join(traceback.format_list(stack)), flush=True)
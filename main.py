@@ -1,56 +1,55 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import os
 import random
+import time
+import logging
+import string
+import io
+from bisect import bisect_right
 import asyncio
-import json
 from datetime import datetime
-from keep_alive import keep_alive
+from collections import OrderedDict
+from keep_alive import WebServer
+from api import Snapshot, TournamentAPI
+from store import StateStore
+from tournament import FakePlayer, SETTINGS
+from bracket import entry_ids
+from pages import paginate, page_bounds
+from bracket_image import BracketImages
+from journal import TournamentJournal
+from guild_state import GuildState, GuildStateCache
+from teams import TeamRegistry
+from access import MOD_ROLE_ID
+from refresh import EmbedRefresher
+from actors import GuildActors
+from dm import DMDispatcher
+from outbound import OutboundQueue, BRACKET, BACKGROUND
+from logship import LogShipper
+from metrics import registry
+from profiling import HandlerProfiler
+from loopwatch import LoopWatchdog
 
-keep_alive()
 TOKEN = os.getenv("TOKEN")
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+class DashBot(commands.Bot):
+    async def setup_hook(self):
+        await web_server.start()
+    
+    async def close(self):
+        # Stop serving before the gateway goes, so the runner and its
+        # sockets are cleaned up on the loop that owns them.
+        await web_server.close()
+        await super().close()
 
-class Tournament:
-    def __init__(self):
-        self.players = []
-        self.max_players = 0
-        self.active = False
-        self.channel = None
-        self.target_channel = None
-        self.message = None
-        self.rounds = []
-        self.results = []
-        self.eliminated = []
-        self.fake_count = 1
-        self.map = ""
-        self.abilities = ""
-        self.prize_1st = ""
-        self.prize_2nd = ""
-        self.prize_3rd = ""
-        self.prize_4th = ""
-        self.title = ""
-        self.mode = "1v1"
-        self.match_winners = {}
+bot = DashBot(command_prefix="!", intents=intents)
+web_server = WebServer(bot, port=int(os.getenv("PORT", "8080")))
 
-def get_tournament(guild_id):
-    if guild_id not in tournaments:
-        tournaments[guild_id] = Tournament()
-    return tournaments[guild_id]
-
-tournaments = {}
-role_permissions = {}
-teams = {}
-team_invitations = {}
-player_teams = {}
-log_channels = {}
-bracket_roles = {}
 host_registrations = {
     'active': False,
     'max_hosters': 0,
@@ -59,88 +58,267 @@ host_registrations = {
     'message': None
 }
 
+store = StateStore('user_data.db')
+journal = TournamentJournal(store)
+
+BRACKET_SIZES = [2 ** n for n in range(1, 11)]
+
 def load_data():
-    global role_permissions, log_channels, bracket_roles
-    try:
-        with open('user_data.json', 'r') as f:
-            data = json.load(f)
-            role_permissions = data.get('role_permissions', {})
-            log_channels = data.get('log_channels', {})
-            bracket_roles = data.get('bracket_roles', {})
-    except FileNotFoundError:
-        pass
+    if store.migrate_json('user_data.json'):
+        print("✅ Migrated user_data.json into user_data.db")
 
-def save_data():
-    data = {
-        'role_permissions': role_permissions,
-        'log_channels': log_channels,
-        'bracket_roles': bracket_roles
-    }
-    with open('user_data.json', 'w') as f:
-        json.dump(data, f)
+def resolve_member(guild_id, user_id):
+    guild = bot.get_guild(guild_id)
+    member = guild.get_member(user_id) if guild else None
+    return member or discord.Object(id=user_id)
 
-def has_permission(user, guild_id, permission_type):
-    guild_str = str(guild_id)
-    if guild_str not in role_permissions:
-        return False
-    
-    if 'adr' in role_permissions[guild_str]:
-        user_role_ids = [role.id for role in user.roles]
-        adr_role_ids = role_permissions[guild_str]['adr']
-        if any(role_id in adr_role_ids for role_id in user_role_ids):
-            return True
-    
-    if permission_type not in role_permissions[guild_str]:
-        return False
-    
-    user_role_ids = [role.id for role in user.roles]
-    allowed_role_ids = role_permissions[guild_str][permission_type]
-    
-    return any(role_id in allowed_role_ids for role_id in user_role_ids)
+def load_guild_state(guild_id):
+    cold_snapshots.pop(guild_id, None)
+    return GuildState(
+        guild_id,
+        tournament=journal.load(guild_id, resolve_member, bot.get_channel),
+        role_permissions=store.load_role_permissions(guild_id),
+        log_channel=store.load_log_channel(guild_id),
+        bracket_roles=store.load_bracket_roles(guild_id),
+        teams=TeamRegistry(*store.load_teams(guild_id)),
+        bracket_roles_messages=store.load_bracket_roles_messages(guild_id)
+    )
+
+def unload_guild_state(state):
+    # The journal's sequence numbers stay until the state is really gone:
+    # a guild revived from unloading keeps appending where it left off.
+    journal.snapshot(state.guild_id, state.tournament)
+
+guild_actors = GuildActors()
+outbound = OutboundQueue(
+    concurrency=int(os.getenv("OUTBOUND_CONCURRENCY", "50")),
+    background_slots=int(os.getenv("OUTBOUND_BACKGROUND_SLOTS", "4"))
+)
+bracket_images = BracketImages()
+dm_dispatcher = DMDispatcher(concurrency=int(os.getenv("DM_CONCURRENCY", "5")))
+profiler = HandlerProfiler(
+    enabled=os.getenv("PROFILE_HANDLERS") == "1",
+    cprofile=os.getenv("PROFILE_CPROFILE") == "1",
+    threshold=float(os.getenv("PROFILE_SLOW_SECONDS", "1")),
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    keep=int(os.getenv("PROFILE_KEEP", "50"))
+)
+loop_watchdog = LoopWatchdog(threshold=float(os.getenv("LOOP_WATCHDOG_SECONDS", "0.5")))
+embed_refresher = EmbedRefresher(window=float(os.getenv("EMBED_REFRESH_SECONDS", "2")), outbound=outbound)
+
+guild_states = GuildStateCache(
+    load_guild_state,
+    unload_guild_state,
+    max_resident=int(os.getenv("MAX_RESIDENT_GUILDS", "1000")),
+    idle_timeout=int(os.getenv("GUILD_IDLE_SECONDS", "1800"))
+)
+
+# API snapshots of guilds that aren't resident, built straight from the
+# journal. A guild's entry goes as soon as it is loaded, since only a
+# resident guild can change.
+cold_snapshots = OrderedDict()
+MAX_COLD_SNAPSHOTS = 256
+
+def get_guild_state(guild_id):
+    return guild_states.get(guild_id)
+
+def get_tournament(guild_id):
+    return get_guild_state(guild_id).tournament
+
+def record_event(guild_id, event, **data):
+    tournament = get_tournament(guild_id)
+    watched = tournament_api.watched(guild_id)
+    before = delta_context(tournament, event, data) if watched else None
+    tournament.apply(event, data)
+    journal.record(guild_id, tournament, event, data)
+    if watched:
+        publish_delta(guild_id, tournament, event, data, before)
+
+def is_bot_entry(entry):
+    return all(isinstance(player, FakePlayer) for player in (entry if isinstance(entry, list) else [entry]))
+
+def advance_bot_matches(guild_id, node=None):
+    # Nobody can report a bot-vs-bot match, so those are settled as soon as
+    # they come up; the first entry goes through. After the report that
+    # filled node only its parent can have become one, unless the round
+    # moved on: a new round is scanned once, like round 1 in !start.
+    bracket = get_tournament(guild_id).bracket
+    if node is None or (not bracket.finished and bracket.round_of(node) != bracket.round):
+        first = bracket.node(bracket.round, 0)
+        matches = range(first, first + bracket.match_count(bracket.round))
+    else:
+        matches = [node >> 1] if node > 1 else []
+    
+    while matches and not bracket.finished:
+        round_number = bracket.round
+        parents = []
+        for match in matches:
+            a, b = bracket.tree[2 * match], bracket.tree[2 * match + 1]
+            if bracket.tree[match] is None and bracket.round_of(match) == round_number and a is not None and b is not None and is_bot_entry(a) and is_bot_entry(b):
+                record_event(guild_id, 'winner', player_id=entry_ids(a)[0])
+                if match > 1:
+                    parents.append(match >> 1)
+        if bracket.round != round_number:
+            first = bracket.node(bracket.round, 0)
+            matches = range(first, first + bracket.match_count(bracket.round))
+        else:
+            matches = parents
+
+def get_log_channel(guild_id):
+    return get_guild_state(guild_id).log_channel
+
+def set_log_channel(guild_id, channel_id):
+    get_guild_state(guild_id).log_channel = channel_id
+    store.set_log_channel(guild_id, channel_id)
+
+def get_bracket_roles_messages(guild_id):
+    return get_guild_state(guild_id).bracket_roles_messages
+
+def set_bracket_roles_messages(guild_id, channel_id, message_ids):
+    get_guild_state(guild_id).bracket_roles_messages = (channel_id, message_ids)
+    store.set_bracket_roles_messages(guild_id, channel_id, message_ids)
+
+def get_bracket_roles(guild_id):
+    return get_guild_state(guild_id).bracket_roles
+
+def set_bracket_role(guild_id, user_id, emojis):
+    get_bracket_roles(guild_id)[str(user_id)] = emojis
+    get_guild_state(guild_id).renders.invalidate_names(user_id)
+    store.set_bracket_role(guild_id, user_id, emojis)
+
+def delete_bracket_role(guild_id, user_id):
+    get_bracket_roles(guild_id).pop(str(user_id), None)
+    get_guild_state(guild_id).renders.invalidate_names(user_id)
+    store.delete_bracket_role(guild_id, user_id)
+
+def clear_bracket_roles(guild_id):
+    get_guild_state(guild_id).bracket_roles = {}
+    get_guild_state(guild_id).renders.invalidate_names()
+    store.clear_bracket_roles(guild_id)
+
+command_seconds = registry.histogram("dash_command_seconds", "Prefix command handling time, including the wait for the guild's actor.", ("command",))
+app_command_seconds = registry.histogram("dash_app_command_seconds", "Slash command handling time.", ("command",))
+interaction_ack_seconds = registry.histogram("dash_interaction_ack_seconds", "Time from an interaction's creation to its handler returning, answered.", ("name",))
+interaction_ack_missed = registry.counter("dash_interaction_ack_missed_total", "Interactions whose handler returned without answering.", ("name",))
+api_requests = registry.counter("dash_discord_requests_total", "Discord API requests by route.", ("method", "route"))
+api_rate_limits = registry.counter("dash_discord_rate_limits_total", "429 responses from Discord by route.", ("method", "route"))
+loop_lag_seconds = registry.histogram("dash_event_loop_lag_seconds", "How late a 1-second timer fires on the event loop.")
+active_tournaments = registry.gauge("dash_active_tournaments", "Started tournaments in resident guilds.")
+registered_players = registry.gauge("dash_registered_players", "Players signed up or playing in resident guilds.")
+resident_guilds = registry.gauge("dash_resident_guilds", "Guild states held in memory.")
+persistence_queue = registry.gauge("dash_persistence_queue_depth", "Writes waiting for the next persistence flush.")
+outbound_queue = registry.gauge("dash_outbound_queue_depth", "Requests waiting in the outbound queue.")
+log_buffer = registry.gauge("dash_log_buffer_depth", "Log entries waiting to be shipped.")
+
+# url -> (method, route template) for recent requests, so 429s that
+# discord.py only reports in its logs can be put back on their route.
+request_routes = {}
+
+def instrument_http(http):
+    original = http.request
+    
+    async def request(route, **kwargs):
+        labels = (route.method, route.path)
+        api_requests.inc(*labels)
+        request_routes.pop(route.url, None)
+        request_routes[route.url] = labels
+        if len(request_routes) > 1000:
+            del request_routes[next(iter(request_routes))]
+        return await original(route, **kwargs)
+    
+    http.request = request
+
+class RateLimitLogHandler(logging.Handler):
+    def emit(self, record):
+        if not str(record.msg).startswith('We are being rate limited.') or len(record.args) < 2:
+            return
+        method, url = record.args[0], record.args[1]
+        api_rate_limits.inc(*request_routes.get(url, (method, url)))
+
+instrument_http(bot.http)
+logging.getLogger('discord.http').addHandler(RateLimitLogHandler())
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def stop_command_timer(ctx):
+    started_at = getattr(ctx, 'started_at', None)
+    if started_at is not None:
+        command_seconds.observe(time.perf_counter() - started_at, ctx.command.qualified_name)
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    app_command_seconds.observe((discord.utils.utcnow() - interaction.created_at).total_seconds(), command.qualified_name)
+    observe_interaction_ack(interaction)
+
+def interaction_name(interaction):
+    if interaction.command is not None:
+        return interaction.command.qualified_name
+    return (interaction.data or {}).get('custom_id', str(interaction.type))
+
+def observe_interaction_ack(interaction):
+    # Called once the handler has returned, so the sample is an upper bound
+    # on when the response went out.
+    name = interaction_name(interaction)
+    if interaction.response.is_done():
+        interaction_ack_seconds.observe((discord.utils.utcnow() - interaction.created_at).total_seconds(), name)
+    else:
+        interaction_ack_missed.inc(name)
+
+@tasks.loop(seconds=1)
+async def sample_runtime():
+    now = asyncio.get_running_loop().time()
+    last = getattr(sample_runtime, 'last_tick', None)
+    sample_runtime.last_tick = now
+    if last is not None:
+        loop_lag_seconds.observe(max(0.0, now - last - 1))
+    
+    states = list(guild_states.states.values())
+    active_tournaments.set(sum(1 for state in states if state.tournament.active))
+    registered_players.set(sum(len(state.tournament.players) if state.tournament.active else len(state.tournament.registration.players()) for state in states))
+    resident_guilds.set(len(states))
+    persistence_queue.set(len(store.writer))
+    outbound_queue.set(len(outbound))
+    log_buffer.set(len(log_shipper))
+
+@tasks.loop(seconds=60)
+async def evict_idle_guilds():
+    guild_states.evict_idle()
+    evicted = dict(guild_states.unloading)
+    if evicted:
+        await store.writer.drain()
+        for guild_id in guild_states.forget_unloaded(evicted):
+            journal.forget(guild_id)
+
+def can(member, guild_id, gate):
+    return get_guild_state(guild_id).access.allows(member, gate)
+
+def get_teams(guild_id):
+    return get_guild_state(guild_id).teams
 
 def get_team_id(guild_id, user_id):
-    guild_str = str(guild_id)
-    user_str = str(user_id)
-    return player_teams.get(guild_str, {}).get(user_str)
+    return get_teams(guild_id).team_of(user_id)
 
 def get_team_members(guild_id, team_id):
-    guild_str = str(guild_id)
-    return teams.get(guild_str, {}).get(team_id, [])
+    return [resolve_member(guild_id, user_id) for user_id in get_teams(guild_id).members(team_id)]
 
 def get_teammate(guild_id, user_id):
-    team_id = get_team_id(guild_id, user_id)
-    if not team_id:
+    teammate_id = get_teams(guild_id).teammate(user_id)
+    if teammate_id is None:
         return None
-    team_members = get_team_members(guild_id, team_id)
-    for member in team_members:
-        if member.id != user_id:
-            return member
-    return None
+    return resolve_member(guild_id, teammate_id)
 
 def create_team(guild_id, player1, player2):
-    guild_str = str(guild_id)
-    
-    if guild_str not in teams:
-        teams[guild_str] = {}
-        player_teams[guild_str] = {}
-    
-    team_id = f"team_{len(teams[guild_str]) + 1}_{guild_id}"
-    
-    teams[guild_str][team_id] = [player1, player2]
-    player_teams[guild_str][str(player1.id)] = team_id
-    player_teams[guild_str][str(player2.id)] = team_id
-    
+    registry = get_teams(guild_id)
+    team_id = registry.create(player1.id, player2.id)
+    store.save_team(guild_id, team_id, registry.members(team_id), registry.next_team_id)
     return team_id
 
 def remove_team(guild_id, team_id):
-    guild_str = str(guild_id)
-    
-    if guild_str in teams and team_id in teams[guild_str]:
-        for player in teams[guild_str][team_id]:
-            if str(player.id) in player_teams[guild_str]:
-                del player_teams[guild_str][str(player.id)]
-        
-        del teams[guild_str][team_id]
+    get_teams(guild_id).remove(team_id)
+    store.delete_team(guild_id, team_id)
 
 def get_team_display_name(guild_id, team_members):
     if len(team_members) == 2:
@@ -155,16 +333,346 @@ def get_player_display_name(player, guild_id=None):
     
     return player.name if hasattr(player, 'name') else str(player)
 
+def decorated_name(player, guild_id):
+    def build():
+        player_name = get_player_display_name(player, guild_id)
+        guild_roles = get_bracket_roles(guild_id)
+        if str(player.id) in guild_roles and not isinstance(player, FakePlayer):
+            emojis = ''.join(guild_roles[str(player.id)])
+            player_name = f"{player_name} {emojis}"
+        return player_name
+    
+    # Unresolved members render as placeholders until they are cached, so
+    # those aren't worth keeping.
+    if isinstance(player, discord.Object):
+        return build()
+    return get_guild_state(guild_id).renders.name(player.id, build)
+
+def build_signup_embed(guild_id, tournament):
+    renders = get_guild_state(guild_id).renders
+    return renders.memo(tournament.version, 'signup', lambda: render_signup_embed(renders, tournament))
+
+def render_signup_embed(renders, tournament):
+    settings = tuple(getattr(tournament, name) for name in SETTINGS)
+    rules = renders.static_text(settings, lambda: (
+        f"<:Abilitys:1401884706219495514> Abilityes: {tournament.abilities}\n"
+        f"<:map:1413196286500405308> Map: {tournament.map}\n"
+        f"<:target:1408580791134584893> Mode: {tournament.mode}\n\n"
+        f"<:Crown:1400924187325104258> **Prizes**\n"
+        f"<a:1st:1413906428850344028> 1st: {tournament.prize_1st}\n"
+        f"<a:2nd_animated:1413906496164724968> 2nd: {tournament.prize_2nd}\n"
+        f"<a:3rd_animated:1413906557997154385> 3rd: {tournament.prize_3rd}\n"
+        f"<:TrialTime:1401884029279670303> 4th: {tournament.prize_4th}\n\n"
+        f"__________\n"
+        f"**{tournament.title} Tournament Rules:**\n"
+        f"<:gift:1408573743512686623> Don't use hacks.\n"
+        f"<:gift:1408573743512686623> Don't team, only in case of 2v2.\n"
+        f"<:gift:1408573743512686623> You have 2 minutes to join.\n"
+        f"<:gift:1408573743512686623> Listen to the Hoster's decision, and don't contest.\n"
+        f"<:gift:1408573743512686623> Open a ticket to claim your prize."
+    ))
+    
+    embed = discord.Embed(
+        title=f"<:trophy:1408575094409662474> {tournament.title} <:trophy:1408575094409662474>",
+        color=0x00ff00
+    )
+    
+    embed.add_field(
+        name="\u200b",
+        value=f"<:TeamSizeIcon:1413196379924336691> Players: {len(tournament.registration)}/{tournament.max_players}\n{rules}",
+        inline=False
+    )
+    
+    embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956201656193024/Screenshot_20251012-1832592.png")
+    
+    return embed
+
+RESULT_PREFIX = "\n<:Crown:1400924187325104258> "
+
+def round_fields(guild_id, mode, bracket, round_number, start=0, stop=None):
+    # Returns (name, value, headroom) per match, where headroom is how much
+    # longer the value gets once the match has a winner.
+    def side(entry):
+        if mode == "2v2":
+            return " & ".join(decorated_name(player, guild_id) for player in entry)
+        return decorated_name(entry, guild_id)
+    
+    fields = []
+    for index, (a, b) in enumerate(bracket.matches(round_number, start, stop), start):
+        side_a = side(a)
+        side_b = side(b)
+        name = f"<:Abilitys:1401884706219495514> Match {index + 1}"
+        value = f"{side_a} <:vs:1400922770774163456> {side_b}"
+        winner = bracket.winner(round_number, index)
+        if winner is None:
+            fields.append((name, value, len(RESULT_PREFIX) + max(len(side_a), len(side_b))))
+        else:
+            fields.append((name, value + RESULT_PREFIX + (side_a if winner is a else side_b), 0))
+    return fields
+
+def bracket_image_rounds(guild_id, mode, bracket):
+    # Image input for the rounds still to be played, as plain labels so it
+    # can be pickled to the render process and used as a cache key.
+    def label(entry):
+        if entry is None:
+            return "?"
+        if mode == "2v2":
+            return " & ".join(decorated_name(player, guild_id) for player in entry)
+        return decorated_name(entry, guild_id)
+    
+    rounds = []
+    for round_number in range(bracket.round, bracket.rounds_total + 1):
+        column = []
+        for index, (a, b) in enumerate(bracket.matches(round_number)):
+            winner = bracket.winner(round_number, index)
+            column.append((label(a), label(b), None if winner is None else 0 if winner is a else 1))
+        rounds.append(tuple(column))
+    return tuple(rounds), (label(bracket.champion) if bracket.finished else None)
+
+def build_round_page(guild_id, title, mode, bracket, round_number, starts, page, image=False):
+    start, stop = page_bounds(starts, page, bracket.match_count(round_number))
+    
+    embed = discord.Embed(
+        title=f"<:trophy:1408575094409662474>{title} - Round {round_number}",
+        color=0x3498db
+    )
+    
+    for name, value, _ in round_fields(guild_id, mode, bracket, round_number, start, stop):
+        embed.add_field(name=name, value=value, inline=False)
+    
+    if len(starts) > 1:
+        embed.set_footer(text=f"Page {page + 1}/{len(starts)}")
+    if page == len(starts) - 1:
+        if image:
+            embed.set_image(url="attachment://bracket.png")
+        else:
+            embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956177497133066/Screenshot_20251012-1832542.png")
+    return embed
+
+def build_winners_text(guild_id, tournament):
+    bracket = tournament.bracket
+    round_number = bracket.round
+    match_count = bracket.match_count(round_number)
+    
+    winners_text = f"**Round {round_number} Winners:**\n\n"
+    
+    for i in range(match_count):
+        winner = bracket.winner(round_number, i)
+        
+        if winner is not None:
+            if tournament.mode == "2v2":
+                winner_display = get_team_display_name(guild_id, winner)
+            else:
+                winner_display = get_player_display_name(winner, guild_id)
+            line = f"Match {i + 1}: **{winner_display}**\n"
+        else:
+            line = f"Match {i + 1}: **?**\n"
+        
+        # Stay inside Discord's 2000-character message limit on big rounds.
+        if len(winners_text) + len(line) > 1950:
+            winners_text += f"...and {match_count - i} more matches."
+            break
+        winners_text += line
+    
+    return winners_text
+
+def build_results_embed(guild_id, tournament):
+    embed = discord.Embed(color=0xffd700)
+    results_display = "<:Leaderboard:1406282721436762244>Top 4<:Leaderboard:1406282721436762244>\n"
+    
+    for place, player_obj in tournament.bracket.placements()[:4]:
+        if tournament.mode == "2v2" and isinstance(player_obj, list):
+            player_str = get_team_display_name(guild_id, player_obj)
+        else:
+            player_str = get_player_display_name(player_obj, guild_id)
+        if place == 1:
+            results_display += f"<a:1st:1413906428850344028>1st: {player_str}\n"
+        elif place == 2:
+            results_display += f"<a:2nd_animated:1413906496164724968>2nd: {player_str}\n"
+        elif place == 3:
+            results_display += f"<a:3rd_animated:1413906557997154385>3rd: {player_str}\n"
+        elif place == 4:
+            results_display += f"<:TimeTrial:1401999416688382096>4th: {player_str}\n"
+    
+    results_display += "\n<:star:1413871338803822684>Congrats!\n"
+    
+    results_display += f"\n<:Crown:1400924187325104258> **Prizes**\n"
+    results_display += f"<a:1st:1413906428850344028> 1st: {tournament.prize_1st}\n"
+    results_display += f"<a:2nd_animated:1413906496164724968> 2nd: {tournament.prize_2nd}\n"
+    results_display += f"<a:3rd_animated:1413906557997154385> 3rd: {tournament.prize_3rd}\n"
+    results_display += f"<:TimeTrial:1401999416688382096> 4th: {tournament.prize_4th}"
+    
+    embed.add_field(name="\u200b", value=results_display, inline=False)
+    embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956154688377002/Screenshot_20251012-1832422.png")
+    return embed
+
+def api_entry(entry):
+    if entry is None:
+        return None
+    players = entry if isinstance(entry, (list, tuple)) else [entry]
+    # Ids go out as strings; snowflakes don't fit in a JavaScript number.
+    return [{
+        'id': str(player.id),
+        'name': None if isinstance(player, FakePlayer) else getattr(player, 'name', None),
+        'bot': isinstance(player, FakePlayer)
+    } for player in players]
+
+def build_tournament_json(guild_id, tournament):
+    bracket = tournament.bracket
+    data = {
+        'guild_id': str(guild_id),
+        'active': tournament.active,
+        'title': tournament.title,
+        'mode': tournament.mode,
+        'map': tournament.map,
+        'abilities': tournament.abilities,
+        'max_players': tournament.max_players,
+        'prizes': [tournament.prize_1st, tournament.prize_2nd, tournament.prize_3rd, tournament.prize_4th],
+        'players': [api_entry(entry) for entry in (bracket.entrants if bracket else tournament.registration.entries.values())],
+        'round': None,
+        'rounds_total': None,
+        'rounds': [],
+        'match_winners': [],
+        'champion': None,
+        'placements': []
+    }
+    if bracket is None:
+        return data
+    
+    data['round'] = bracket.round
+    data['rounds_total'] = bracket.rounds_total
+    for round_number in range(1, bracket.rounds_total + 1):
+        data['rounds'].append([[api_entry(a), api_entry(b)] for a, b in bracket.matches(round_number)])
+        data['match_winners'].append([api_entry(bracket.winner(round_number, index)) for index in range(bracket.match_count(round_number))])
+    data['champion'] = api_entry(bracket.champion)
+    data['placements'] = [{'place': place, 'entry': api_entry(entry)} for place, entry in bracket.placements()]
+    return data
+
+def tournament_snapshot(guild_id):
+    if bot.get_guild(guild_id) is None:
+        return None
+    # Never goes through guild_states.get: polling must not load a guild,
+    # refresh its last_used or push another guild out.
+    state = guild_states.peek(guild_id)
+    if state is not None:
+        tournament = state.tournament
+        return state.renders.memo(tournament.version, 'api', lambda: Snapshot(build_tournament_json(guild_id, tournament)))
+    
+    snapshot = cold_snapshots.get(guild_id)
+    if snapshot is not None:
+        cold_snapshots.move_to_end(guild_id)
+        return snapshot
+    tournament = journal.read(guild_id, resolve_member, bot.get_channel)[0]
+    snapshot = cold_snapshots[guild_id] = Snapshot(build_tournament_json(guild_id, tournament))
+    if len(cold_snapshots) > MAX_COLD_SNAPSHOTS:
+        cold_snapshots.popitem(last=False)
+    return snapshot
+
+tournament_api = TournamentAPI(web_server.app, tournament_snapshot)
+
+def delta_context(tournament, event, data):
+    # What a delta needs that apply() is about to overwrite.
+    if event == 'winner':
+        return tournament.bracket.match_of(data['player_id'])
+    if event == 'unregistered':
+        return [tournament.registration.entries.get(key) for key in data['keys']]
+    return None
+
+def publish_delta(guild_id, tournament, event, data, before):
+    def publish(name, payload):
+        tournament_api.publish(guild_id, name, payload, tournament.version)
+    
+    bracket = tournament.bracket
+    if event == 'created':
+        publish('created', {'title': tournament.title, 'mode': tournament.mode, 'max_players': tournament.max_players})
+    elif event == 'reset':
+        publish('reset', {})
+    elif event == 'registered':
+        publish('registered', {'entries': [api_entry(players) for _, players in data['entries']]})
+    elif event == 'unregistered':
+        publish('unregistered', {'entries': [api_entry(players) for players in before if players]})
+    elif event == 'started':
+        publish('started', {'rounds_total': bracket.rounds_total, 'players': [api_entry(entry) for entry in bracket.entrants]})
+    elif event == 'winner':
+        round_number, index = before
+        publish('winner', {'round': round_number, 'match': index, 'winner': api_entry(bracket.winner(round_number, index))})
+        if bracket.finished:
+            publish('finished', {
+                'champion': api_entry(bracket.champion),
+                'placements': [{'place': place, 'entry': api_entry(entry)} for place, entry in bracket.placements()]
+            })
+        elif bracket.round != round_number:
+            publish('round', {'round': bracket.round, 'matches': [[api_entry(a), api_entry(b)] for a, b in bracket.matches(bracket.round)]})
+
+async def announce_round(ctx, tournament):
+    bracket = tournament.bracket
+    round_number = bracket.round
+    fields = round_fields(ctx.guild.id, tournament.mode, bracket, round_number)
+    # Pages are sized for every match being decided, so result edits never
+    # push one over the limits.
+    starts = paginate([len(name) + len(value) + headroom for name, value, headroom in fields], reserved=len(tournament.title) + 100)
+    
+    rounds, champion = bracket_image_rounds(ctx.guild.id, tournament.mode, bracket)
+    image = await bracket_images.render(tournament.title, rounds, champion)
+    
+    messages = []
+    for page in range(len(starts)):
+        embed = build_round_page(ctx.guild.id, tournament.title, tournament.mode, bracket, round_number, starts, page, image is not None)
+        if page == len(starts) - 1:
+            if image is not None:
+                file = discord.File(io.BytesIO(image), filename="bracket.png")
+                send = lambda: ctx.send(embed=embed, view=WinnersView(), file=file)
+            else:
+                send = lambda: ctx.send(embed=embed, view=WinnersView())
+        else:
+            send = lambda: ctx.send(embed=embed)
+        messages.append(await outbound.run(BRACKET, ctx.channel.id, send))
+    record_event(ctx.guild.id, 'pages', round=round_number, starts=starts, messages=messages, image=image is not None)
+
+def refresh_match_page(guild_id, tournament, round_number, match_index):
+    # Only the page holding the match is edited; the refresher folds several
+    # results on the same page into one edit.
+    if tournament.page_round != round_number or not tournament.page_messages:
+        return
+    
+    starts = tournament.page_starts
+    page = bisect_right(starts, match_index) - 1
+    message = tournament.page_messages[page]
+    if message is None:
+        return
+    
+    title, mode, bracket, image = tournament.title, tournament.mode, tournament.bracket, tournament.page_image
+    embed_refresher.schedule(message, lambda: build_round_page(guild_id, title, mode, bracket, round_number, starts, page, image))
+
+async def announce_progress(ctx, tournament, round_number):
+    # Called after results for round_number were recorded: posts the final
+    # standings or the next round, whichever the bracket has reached.
+    bracket = tournament.bracket
+    if bracket.finished:
+        await ctx.send(embed=build_results_embed(ctx.guild.id, tournament), view=discord.ui.View())
+        record_event(ctx.guild.id, 'reset')
+    elif bracket.round > round_number:
+        await announce_round(ctx, tournament)
+
+async def report_code_delivery(ctx, report):
+    if not report.failed:
+        return await ctx.send("✅ Codes sent via DM!", delete_after=3)
+    await ctx.send(f"⚠️ Codes sent to {len(report.sent)}/{len(report.outcomes)} players. Could not DM: {report.describe_failures()}", delete_after=15)
+
+async def ship_logs(channel_id, embeds):
+    channel = bot.get_channel(channel_id)
+    if channel:
+        await outbound.run(BACKGROUND, channel_id, lambda: channel.send(embeds=embeds))
+
+log_shipper = LogShipper(ship_logs, delay=float(os.getenv("LOG_FLUSH_SECONDS", "2")))
+
 async def log_command(guild_id, user, command, details=""):
-    guild_str = str(guild_id)
-    if guild_str not in log_channels:
+    # Only queues the entry; the shipper packs and sends it later.
+    log_channel_id = get_log_channel(guild_id)
+    if not log_channel_id:
         return
     
     try:
-        channel = bot.get_channel(log_channels[guild_str])
-        if not channel:
-            return
-        
         embed = discord.Embed(
             title="📋 Tournament Command Used",
             color=0x3498db,
@@ -176,59 +684,100 @@ async def log_command(guild_id, user, command, details=""):
         if details:
             embed.add_field(name="Details", value=details, inline=False)
         
-        await channel.send(embed=embed)
+        log_shipper.put(log_channel_id, embed)
     except Exception as e:
         print(f"Error logging command: {e}")
 
+BRACKET_ROLES_TITLE = "<:bracketrole:1413196441564315810> Bracket Roles"
+
+def build_bracket_roles_embeds(guild):
+    pages = []
+    roles_text = ""
+    for user_id, emojis in get_bracket_roles(guild.id).items():
+        member = guild.get_member(int(user_id))
+        if not member:
+            continue
+        line = f"{member.mention}: {''.join(emojis)}\n"
+        # Embed descriptions stop at 4096 characters; the rest spills onto
+        # another message.
+        if len(roles_text) + len(line) > 4096:
+            pages.append(roles_text)
+            roles_text = ""
+        roles_text += line
+    if roles_text:
+        pages.append(roles_text)
+    if not pages:
+        pages.append("No bracket roles assigned yet.")
+    
+    embeds = []
+    for i, description in enumerate(pages):
+        embed = discord.Embed(title=BRACKET_ROLES_TITLE, description=description, color=0x9b59b6)
+        if len(pages) > 1:
+            embed.set_footer(text=f"Page {i + 1}/{len(pages)}")
+        embeds.append(embed)
+    return embeds
+
+async def find_bracket_roles_message(channel, limit):
+    async for message in channel.history(limit=limit):
+        if message.author == bot.user and message.embeds:
+            embed = message.embeds[0]
+            if embed.title and "Bracket Roles" in embed.title:
+                return message
+    return None
+
+async def publish_bracket_roles(guild, channel, message_ids):
+    # Writes one page per message, editing the given ones in place, posting
+    # any extra pages and deleting leftovers. Returns the ids now holding the
+    # pages, or None if one of the given messages no longer exists.
+    embeds = build_bracket_roles_embeds(guild)
+    ids = []
+    for i, embed in enumerate(embeds):
+        if i < len(message_ids):
+            message = channel.get_partial_message(message_ids[i])
+            try:
+                await outbound.run(BACKGROUND, channel.id, lambda: message.edit(embed=embed))
+            except discord.NotFound:
+                return None
+        else:
+            message = await outbound.run(BACKGROUND, channel.id, lambda: channel.send(embed=embed))
+        ids.append(message.id)
+    
+    for message_id in message_ids[len(embeds):]:
+        try:
+            await outbound.run(BACKGROUND, channel.id, lambda: channel.get_partial_message(message_id).delete())
+        except discord.NotFound:
+            pass
+    return ids
+
 async def auto_update_alllogs(guild):
-    guild_str = str(guild.id)
-    if guild_str not in log_channels:
+    log_channel_id = get_log_channel(guild.id)
+    if not log_channel_id:
         return
     
     try:
-        channel = bot.get_channel(log_channels[guild_str])
-        if not channel:
-            return
+        saved = get_bracket_roles_messages(guild.id)
+        ids = None
+        if saved:
+            channel = bot.get_channel(saved[0])
+            if channel:
+                ids = await publish_bracket_roles(guild, channel, saved[1])
+        
+        if ids is None:
+            # Set up before the message ids were kept, or the message was
+            # deleted: find it the old way.
+            channel = bot.get_channel(log_channel_id)
+            if not channel:
+                return
+            message = await find_bracket_roles_message(channel, 50)
+            if not message:
+                return
+            ids = await publish_bracket_roles(guild, channel, [message.id])
         
-        async for message in channel.history(limit=50):
-            if message.author == bot.user and message.embeds:
-                embed = message.embeds[0]
-                if embed.title and "Bracket Roles" in embed.title:
-                    new_embed = discord.Embed(
-                        title="<:bracketrole:1413196441564315810> Bracket Roles",
-                        color=0x9b59b6
-                    )
-                    
-                    if guild_str in bracket_roles and bracket_roles[guild_str]:
-                        roles_text = ""
-                        for user_id, emojis in bracket_roles[guild_str].items():
-                            try:
-                                member = guild.get_member(int(user_id))
-                                if member:
-                                    emojis_str = ''.join(emojis)
-                                    roles_text += f"{member.mention}: {emojis_str}\n"
-                            except:
-                                pass
-                        
-                        if roles_text:
-                            new_embed.description = roles_text
-                        else:
-                            new_embed.description = "No bracket roles assigned yet."
-                    else:
-                        new_embed.description = "No bracket roles assigned yet."
-                    
-                    await message.edit(embed=new_embed)
-                    return
+        if ids is not None and saved != (channel.id, ids):
+            set_bracket_roles_messages(guild.id, channel.id, ids)
     except Exception as e:
         print(f"Error updating alllogs: {e}")
 
-class FakePlayer:
-    def __init__(self, name, user_id):
-        self.display_name = name
-        self.id = user_id
-        self.name = name
-        self.nick = None
-
 class InviteView(discord.ui.View):
     def __init__(self, inviter, inviter_guild_id):
         super().__init__(timeout=300)
@@ -237,10 +786,6 @@ class InviteView(discord.ui.View):
     
     @discord.ui.button(label="Accept", style=discord.ButtonStyle.green, emoji="<:check:1400922446365855854>", custom_id="invite_accept")
     async def accept_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_str = str(self.inviter_guild_id)
-        inviter_str = str(self.inviter.id)
-        invitee_str = str(interaction.user.id)
-        
         inviter_team_id = get_team_id(self.inviter_guild_id, self.inviter.id)
         if inviter_team_id:
             await interaction.response.send_message("❌ The inviter is already in a team.")
@@ -251,22 +796,14 @@ class InviteView(discord.ui.View):
             await interaction.response.send_message("❌ You are already in a team.")
             return
         
-        team_id = create_team(self.inviter_guild_id, self.inviter, interaction.user)
-        
-        if guild_str in team_invitations and invitee_str in team_invitations[guild_str]:
-            if self.inviter.id in team_invitations[guild_str][invitee_str]:
-                team_invitations[guild_str][invitee_str].remove(self.inviter.id)
+        create_team(self.inviter_guild_id, self.inviter, interaction.user)
+        get_teams(self.inviter_guild_id).clear_invitation(self.inviter.id, interaction.user.id)
         
         await interaction.response.send_message(f"✅ You accepted the invitation! Team created: {self.inviter.name} & {interaction.user.name}!")
     
     @discord.ui.button(label="Decline", style=discord.ButtonStyle.red, emoji="<:uncheck:1400922538644603011>", custom_id="invite_decline")
     async def decline_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        guild_str = str(self.inviter_guild_id)
-        invitee_str = str(interaction.user.id)
-        
-        if guild_str in team_invitations and invitee_str in team_invitations[guild_str]:
-            if self.inviter.id in team_invitations[guild_str][invitee_str]:
-                team_invitations[guild_str][invitee_str].remove(self.inviter.id)
+        get_teams(self.inviter_guild_id).clear_invitation(self.inviter.id, interaction.user.id)
         
         await interaction.response.send_message(f"❌ You declined the invitation from {self.inviter.name}.")
 
@@ -297,7 +834,7 @@ class TicketPanelView(discord.ui.View):
             await interaction.response.send_message(f"❌ You already have a ticket open: {existing_channel.mention}", ephemeral=True)
             return
         
-        mod_role = guild.get_role(1401555224233246811)
+        mod_role = guild.get_role(MOD_ROLE_ID)
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False),
             user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
@@ -324,10 +861,7 @@ class DeleteTicketView(discord.ui.View):
     
     @discord.ui.button(label="Delete Ticket", style=discord.ButtonStyle.red, emoji="🗑️", custom_id="delete_ticket")
     async def delete_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        mod_role_id = 1401555224233246811
-        user_roles = [role.id for role in interaction.user.roles]
-        
-        if mod_role_id not in user_roles and not interaction.user.guild_permissions.administrator:
+        if not can(interaction.user, interaction.guild.id, 'ticket_mod'):
             await interaction.response.send_message("❌ Only moderators can delete tickets!", ephemeral=True)
             return
         
@@ -335,48 +869,40 @@ class DeleteTicketView(discord.ui.View):
         await interaction.channel.delete()
 
 class WinnersView(discord.ui.View):
-    def __init__(self, guild_id):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.guild_id = guild_id
     
     @discord.ui.button(label="Winners", style=discord.ButtonStyle.primary, custom_id="show_winners", emoji="<:Crown:1400924187325104258>")
     async def show_winners(self, interaction: discord.Interaction, button: discord.ui.Button):
-        tournament = get_tournament(self.guild_id)
+        guild_id = interaction.guild.id
+        tournament = get_tournament(guild_id)
         
         if not tournament.active:
             await interaction.response.send_message("❌ No active tournament.", ephemeral=True)
             return
         
-        current_round = tournament.rounds[-1] if tournament.rounds else []
-        round_number = len(tournament.rounds)
-        
-        winners_text = f"**Round {round_number} Winners:**\n\n"
-        
-        for i, match in enumerate(current_round, 1):
-            match_key = f"round_{round_number}_match_{i}"
-            
-            if match_key in tournament.match_winners:
-                winner = tournament.match_winners[match_key]
-                if tournament.mode == "2v2":
-                    winner_display = get_team_display_name(self.guild_id, winner)
-                else:
-                    winner_display = get_player_display_name(winner, self.guild_id)
-                winners_text += f"Match {i}: **{winner_display}**\n"
-            else:
-                winners_text += f"Match {i}: **?**\n"
+        renders = get_guild_state(guild_id).renders
+        winners_text = renders.memo(tournament.version, 'winners', lambda: build_winners_text(guild_id, tournament))
         
         await interaction.response.send_message(winners_text, ephemeral=True)
 
 @bot.event
 async def on_ready():
     print(f"✅ Bot is online as {bot.user}")
-    load_data()
     
     bot.add_view(TournamentView())
     bot.add_view(HosterRegistrationView())
     bot.add_view(TicketPanelView())
     bot.add_view(DeleteTicketView())
     
+    bot.add_view(WinnersView())
+    
+    if not evict_idle_guilds.is_running():
+        evict_idle_guilds.start()
+    if not sample_runtime.is_running():
+        sample_runtime.start()
+    loop_watchdog.start()
+    
     try:
         synced = await bot.tree.sync()
         print(f"✅ Synced {len(synced)} slash commands")
@@ -399,10 +925,32 @@ async def on_member_join(member):
             embed.set_author(name=member.name, icon_url=member.display_avatar.url)
             embed.set_thumbnail(url=member.display_avatar.url)
             
-            await welcome_channel.send(embed=embed)
+            await outbound.run(BACKGROUND, welcome_channel.id, lambda: welcome_channel.send(embed=embed))
         except Exception as e:
             print(f"Error sending welcome message: {e}")
 
+@bot.event
+async def on_member_update(before, after):
+    state = guild_states.peek(after.guild.id)
+    if not state:
+        return
+    if before.roles != after.roles:
+        state.access.invalidate_member(after.id)
+    if before.name != after.name:
+        state.renders.invalidate_names(after.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    state = guild_states.peek(after.guild.id)
+    if state:
+        state.access.invalidate()
+
+@bot.event
+async def on_guild_role_delete(role):
+    state = guild_states.peek(role.guild.id)
+    if state:
+        state.access.invalidate()
+
 class TournamentView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
@@ -413,128 +961,93 @@ class TournamentView(discord.ui.View):
     @discord.ui.button(label="Register", style=discord.ButtonStyle.green, custom_id="tournament_register", emoji="<:check:1400922446365855854>")
     async def register_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
-            tournament = get_tournament(interaction.guild.id)
-            
-            if tournament.max_players == 0:
-                return await interaction.response.send_message("❌ No tournament has been created yet.", ephemeral=True)
-            if tournament.active:
-                return await interaction.response.send_message("⚠️ Tournament already started.", ephemeral=True)
-            
-            if tournament.mode == "2v2":
-                team_id = get_team_id(interaction.guild.id, interaction.user.id)
-                if not team_id:
-                    return await interaction.response.send_message("❌ You need to be in a team to register for 2v2 tournaments! Use `!invite @teammate` to create a team.", ephemeral=True)
-                
-                team_members = get_team_members(interaction.guild.id, team_id)
-                if any(member in tournament.players for member in team_members):
-                    return await interaction.response.send_message("❌ Your team is already registered.", ephemeral=True)
-                
-                current_teams = len(tournament.players) // 2
-                if current_teams >= tournament.max_players:
-                    return await interaction.response.send_message("❌ Tournament is full.", ephemeral=True)
-                
-                tournament.players.extend(team_members)
-                
-                await self.update_tournament_embed(interaction, tournament)
-                await interaction.response.send_message(f"✅ Team registered! ({len(tournament.players) // 2}/{tournament.max_players} teams)", ephemeral=True)
-            
-            else:
-                if interaction.user in tournament.players:
-                    return await interaction.response.send_message("❌ You are already registered.", ephemeral=True)
-                
-                if len(tournament.players) >= tournament.max_players:
-                    return await interaction.response.send_message("❌ Tournament is full.", ephemeral=True)
-                
-                tournament.players.append(interaction.user)
-                
-                await self.update_tournament_embed(interaction, tournament)
-                await interaction.response.send_message(f"✅ Registered! ({len(tournament.players)}/{tournament.max_players})", ephemeral=True)
-        
+            reply = await guild_actors.run(interaction.guild.id, self.register, interaction)
+            await interaction.response.send_message(reply, ephemeral=True)
         except Exception as e:
             print(f"Error in register_button: {e}")
             if not interaction.response.is_done():
                 await interaction.response.send_message("❌ An error occurred.", ephemeral=True)
     
-    @discord.ui.button(label="Unregister", style=discord.ButtonStyle.red, custom_id="tournament_unregister", emoji="<:uncheck:1400922538644603011>")
-    async def unregister_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            tournament = get_tournament(interaction.guild.id)
+    async def register(self, interaction):
+        # Runs on the guild actor and never awaits, so a click only waits
+        # for the checks ahead of it, not for their responses.
+        tournament = get_tournament(interaction.guild.id)
+        
+        if tournament.max_players == 0:
+            return "❌ No tournament has been created yet."
+        if tournament.active:
+            return "⚠️ Tournament already started."
+        
+        if tournament.mode == "2v2":
+            team_id = get_team_id(interaction.guild.id, interaction.user.id)
+            if not team_id:
+                return "❌ You need to be in a team to register for 2v2 tournaments! Use `!invite @teammate` to create a team."
             
-            if tournament.max_players == 0:
-                return await interaction.response.send_message("❌ No tournament has been created yet.", ephemeral=True)
-            if tournament.active:
-                return await interaction.response.send_message("⚠️ Tournament already started.", ephemeral=True)
+            team_members = get_team_members(interaction.guild.id, team_id)
+            if any(member.id in tournament.registration for member in team_members):
+                return "❌ Your team is already registered."
             
-            if tournament.mode == "2v2":
-                team_id = get_team_id(interaction.guild.id, interaction.user.id)
-                if not team_id:
-                    return await interaction.response.send_message("❌ You are not in a team.", ephemeral=True)
-                
-                team_members = get_team_members(interaction.guild.id, team_id)
-                if not any(member in tournament.players for member in team_members):
-                    return await interaction.response.send_message("❌ Your team is not registered.", ephemeral=True)
-                
-                for member in team_members:
-                    if member in tournament.players:
-                        tournament.players.remove(member)
-                
-                await self.update_tournament_embed(interaction, tournament)
-                await interaction.response.send_message(f"✅ Team unregistered! ({len(tournament.players) // 2}/{tournament.max_players} teams)", ephemeral=True)
+            if len(tournament.registration) >= tournament.max_players:
+                return "❌ Tournament is full."
             
-            else:
-                if interaction.user not in tournament.players:
-                    return await interaction.response.send_message("❌ You are not registered.", ephemeral=True)
-                
-                tournament.players.remove(interaction.user)
-                
-                await self.update_tournament_embed(interaction, tournament)
-                await interaction.response.send_message(f"✅ Unregistered! ({len(tournament.players)}/{tournament.max_players})", ephemeral=True)
+            record_event(interaction.guild.id, 'registered', entries=[(team_id, team_members)])
+            self.update_tournament_embed(interaction, tournament)
+            return f"✅ Team registered! ({len(tournament.registration)}/{tournament.max_players} teams)"
+        
+        if interaction.user.id in tournament.registration:
+            return "❌ You are already registered."
         
+        if len(tournament.registration) >= tournament.max_players:
+            return "❌ Tournament is full."
+        
+        record_event(interaction.guild.id, 'registered', entries=[(interaction.user.id, [interaction.user])])
+        self.update_tournament_embed(interaction, tournament)
+        return f"✅ Registered! ({len(tournament.registration)}/{tournament.max_players})"
+    
+    @discord.ui.button(label="Unregister", style=discord.ButtonStyle.red, custom_id="tournament_unregister", emoji="<:uncheck:1400922538644603011>")
+    async def unregister_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        try:
+            reply = await guild_actors.run(interaction.guild.id, self.unregister, interaction)
+            await interaction.response.send_message(reply, ephemeral=True)
         except Exception as e:
             print(f"Error in unregister_button: {e}")
             if not interaction.response.is_done():
                 await interaction.response.send_message("❌ An error occurred.", ephemeral=True)
     
-    async def update_tournament_embed(self, interaction, tournament):
-        try:
-            message = interaction.message
-            if message and message.embeds:
-                current_count = len(tournament.players) if tournament.mode == "1v1" else len(tournament.players) // 2
-                
-                embed = discord.Embed(
-                    title=f"<:trophy:1408575094409662474> {tournament.title} <:trophy:1408575094409662474>",
-                    color=0x00ff00
-                )
-                
-                mode_text = tournament.mode
-                embed.add_field(
-                    name="\u200b",
-                    value=(
-                        f"<:TeamSizeIcon:1413196379924336691> Players: {current_count}/{tournament.max_players}\n"
-                        f"<:Abilitys:1401884706219495514> Abilityes: {tournament.abilities}\n"
-                        f"<:map:1413196286500405308> Map: {tournament.map}\n"
-                        f"<:target:1408580791134584893> Mode: {mode_text}\n\n"
-                        f"<:Crown:1400924187325104258> **Prizes**\n"
-                        f"<a:1st:1413906428850344028> 1st: {tournament.prize_1st}\n"
-                        f"<a:2nd_animated:1413906496164724968> 2nd: {tournament.prize_2nd}\n"
-                        f"<a:3rd_animated:1413906557997154385> 3rd: {tournament.prize_3rd}\n"
-                        f"<:TrialTime:1401884029279670303> 4th: {tournament.prize_4th}\n\n"
-                        f"__________\n"
-                        f"**{tournament.title} Tournament Rules:**\n"
-                        f"<:gift:1408573743512686623> Don't use hacks.\n"
-                        f"<:gift:1408573743512686623> Don't team, only in case of 2v2.\n"
-                        f"<:gift:1408573743512686623> You have 2 minutes to join.\n"
-                        f"<:gift:1408573743512686623> Listen to the Hoster's decision, and don't contest.\n"
-                        f"<:gift:1408573743512686623> Open a ticket to claim your prize."
-                    ),
-                    inline=False
-                )
-                
-                embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956201656193024/Screenshot_20251012-1832592.png")
-                
-                await message.edit(embed=embed)
-        except Exception as e:
-            print(f"Error updating embed: {e}")
+    async def unregister(self, interaction):
+        tournament = get_tournament(interaction.guild.id)
+        
+        if tournament.max_players == 0:
+            return "❌ No tournament has been created yet."
+        if tournament.active:
+            return "⚠️ Tournament already started."
+        
+        if tournament.mode == "2v2":
+            team_id = get_team_id(interaction.guild.id, interaction.user.id)
+            if not team_id:
+                return "❌ You are not in a team."
+            
+            entry_key = tournament.registration.entry_key(interaction.user.id)
+            if entry_key is None:
+                return "❌ Your team is not registered."
+            
+            record_event(interaction.guild.id, 'unregistered', keys=[entry_key])
+            self.update_tournament_embed(interaction, tournament)
+            return f"✅ Team unregistered! ({len(tournament.registration)}/{tournament.max_players} teams)"
+        
+        entry_key = tournament.registration.entry_key(interaction.user.id)
+        if entry_key is None:
+            return "❌ You are not registered."
+        
+        record_event(interaction.guild.id, 'unregistered', keys=[entry_key])
+        self.update_tournament_embed(interaction, tournament)
+        return f"✅ Unregistered! ({len(tournament.registration)}/{tournament.max_players})"
+    
+    def update_tournament_embed(self, interaction, tournament):
+        message = interaction.message
+        if message and message.embeds:
+            guild_id = interaction.guild.id
+            embed_refresher.schedule(message, lambda: build_signup_embed(guild_id, tournament))
 
 class HosterRegistrationView(discord.ui.View):
     def __init__(self):
@@ -603,10 +1116,27 @@ class HosterRegistrationView(discord.ui.View):
         await interaction.response.edit_message(embed=embed, view=self)
         await interaction.followup.send(f"✅ {interaction.user.name} unregistered from hosting.", ephemeral=True)
 
+async def create_tournament(interaction, **settings):
+    # Runs on the guild actor. A !start ahead of it can hold the actor past
+    # the 3-second interaction window, so callers defer before queueing.
+    record_event(
+        interaction.guild.id, 'created',
+        channel=interaction.channel,
+        target_channel=interaction.channel,
+        **settings
+    )
+    tournament = get_tournament(interaction.guild.id)
+    
+    embed = build_signup_embed(interaction.guild.id, tournament)
+    
+    view = TournamentView()
+    message = await interaction.channel.send(embed=embed, view=view)
+    record_event(interaction.guild.id, 'message', message=message)
+
 @bot.tree.command(name="tournament1v1", description="Create a 1v1 tournament")
 @app_commands.describe(
     title="Tournament title (required)",
-    players="Number of players (2, 4, 8, 16, or 32)",
+    players="Number of players (a power of two from 2 to 1024)",
     map="Map name",
     abilityes="Abilities setting",
     first="1st place prize",
@@ -625,70 +1155,34 @@ async def tournament1v1(
     third: str,
     fourth: str
 ):
-    if not has_permission(interaction.user, interaction.guild.id, 'tlr') and not interaction.user.guild_permissions.manage_channels:
+    if not can(interaction.user, interaction.guild.id, 'tlr'):
         return await interaction.response.send_message("❌ You don't have permission to create tournaments.", ephemeral=True)
     
-    if players not in [2, 4, 8, 16, 32]:
-        return await interaction.response.send_message("❌ Players must be 2, 4, 8, 16, or 32!", ephemeral=True)
-    
-    tournament = get_tournament(interaction.guild.id)
-    tournament.__init__()
-    tournament.max_players = players
-    tournament.mode = "1v1"
-    tournament.channel = interaction.channel
-    tournament.target_channel = interaction.channel
-    tournament.title = title
-    tournament.map = map
-    tournament.abilities = abilityes
-    tournament.prize_1st = first
-    tournament.prize_2nd = second
-    tournament.prize_3rd = third
-    tournament.prize_4th = fourth
-    tournament.players = []
-    tournament.eliminated = []
-    tournament.active = False
-    
-    embed = discord.Embed(
-        title=f"<:trophy:1408575094409662474> {tournament.title} <:trophy:1408575094409662474>",
-        color=0x00ff00
+    if players not in BRACKET_SIZES:
+        return await interaction.response.send_message("❌ Players must be a power of two from 2 to 1024 (2, 4, 8, ... 512, 1024)!", ephemeral=True)
+    
+    await interaction.response.defer(ephemeral=True)
+    await guild_actors.run(
+        interaction.guild.id, create_tournament, interaction,
+        max_players=players,
+        mode="1v1",
+        title=title,
+        map=map,
+        abilities=abilityes,
+        prize_1st=first,
+        prize_2nd=second,
+        prize_3rd=third,
+        prize_4th=fourth
     )
     
-    embed.add_field(
-        name="\u200b",
-        value=(
-            f"<:TeamSizeIcon:1413196379924336691> Players: 0/{players}\n"
-            f"<:Abilitys:1401884706219495514> Abilityes: {abilityes}\n"
-            f"<:map:1413196286500405308> Map: {map}\n"
-            f"<:target:1408580791134584893> Mode: 1v1\n\n"
-            f"<:Crown:1400924187325104258> **Prizes**\n"
-            f"<a:1st:1413906428850344028> 1st: {first}\n"
-            f"<a:2nd_animated:1413906496164724968> 2nd: {second}\n"
-            f"<a:3rd_animated:1413906557997154385> 3rd: {third}\n"
-            f"<:TrialTime:1401884029279670303> 4th: {fourth}\n\n"
-            f"__________\n"
-            f"**{tournament.title} Tournament Rules:**\n"
-            f"<:gift:1408573743512686623> Don't use hacks.\n"
-            f"<:gift:1408573743512686623> Don't team, only in case of 2v2.\n"
-            f"<:gift:1408573743512686623> You have 2 minutes to join.\n"
-            f"<:gift:1408573743512686623> Listen to the Hoster's decision, and don't contest.\n"
-            f"<:gift:1408573743512686623> Open a ticket to claim your prize."
-        ),
-        inline=False
-    )
-    
-    embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956201656193024/Screenshot_20251012-1832592.png")
-    
-    view = TournamentView()
-    tournament.message = await interaction.channel.send(embed=embed, view=view)
-    
     await log_command(interaction.guild.id, interaction.user, "/tournament1v1", f"Mode: 1v1, Max players: {players}")
     
-    await interaction.response.send_message("✅ Tournament created successfully!", ephemeral=True)
+    await interaction.followup.send("✅ Tournament created successfully!", ephemeral=True)
 
 @bot.tree.command(name="tournament2v2", description="Create a 2v2 tournament")
 @app_commands.describe(
     title="Tournament title (required)",
-    players="Number of teams (2, 4, 8, or 16)",
+    players="Number of teams (a power of two from 2 to 1024)",
     map="Map name",
     abilityes="Abilities setting",
     first="1st place prize",
@@ -707,65 +1201,29 @@ async def tournament2v2(
     third: str,
     fourth: str
 ):
-    if not has_permission(interaction.user, interaction.guild.id, 'tlr') and not interaction.user.guild_permissions.manage_channels:
+    if not can(interaction.user, interaction.guild.id, 'tlr'):
         return await interaction.response.send_message("❌ You don't have permission to create tournaments.", ephemeral=True)
     
-    if players not in [2, 4, 8, 16]:
-        return await interaction.response.send_message("❌ Teams must be 2, 4, 8, or 16!", ephemeral=True)
-    
-    tournament = get_tournament(interaction.guild.id)
-    tournament.__init__()
-    tournament.max_players = players
-    tournament.mode = "2v2"
-    tournament.channel = interaction.channel
-    tournament.target_channel = interaction.channel
-    tournament.title = title
-    tournament.map = map
-    tournament.abilities = abilityes
-    tournament.prize_1st = first
-    tournament.prize_2nd = second
-    tournament.prize_3rd = third
-    tournament.prize_4th = fourth
-    tournament.players = []
-    tournament.eliminated = []
-    tournament.active = False
-    
-    embed = discord.Embed(
-        title=f"<:trophy:1408575094409662474> {tournament.title} <:trophy:1408575094409662474>",
-        color=0x00ff00
+    if players not in BRACKET_SIZES:
+        return await interaction.response.send_message("❌ Teams must be a power of two from 2 to 1024 (2, 4, 8, ... 512, 1024)!", ephemeral=True)
+    
+    await interaction.response.defer(ephemeral=True)
+    await guild_actors.run(
+        interaction.guild.id, create_tournament, interaction,
+        max_players=players,
+        mode="2v2",
+        title=title,
+        map=map,
+        abilities=abilityes,
+        prize_1st=first,
+        prize_2nd=second,
+        prize_3rd=third,
+        prize_4th=fourth
     )
     
-    embed.add_field(
-        name="\u200b",
-        value=(
-            f"<:TeamSizeIcon:1413196379924336691> Players: 0/{players}\n"
-            f"<:Abilitys:1401884706219495514> Abilityes: {abilityes}\n"
-            f"<:map:1413196286500405308> Map: {map}\n"
-            f"<:target:1408580791134584893> Mode: 2v2\n\n"
-            f"<:Crown:1400924187325104258> **Prizes**\n"
-            f"<a:1st:1413906428850344028> 1st: {first}\n"
-            f"<a:2nd_animated:1413906496164724968> 2nd: {second}\n"
-            f"<a:3rd_animated:1413906557997154385> 3rd: {third}\n"
-            f"<:TrialTime:1401884029279670303> 4th: {fourth}\n\n"
-            f"__________\n"
-            f"**{tournament.title} Tournament Rules:**\n"
-            f"<:gift:1408573743512686623> Don't use hacks.\n"
-            f"<:gift:1408573743512686623> Don't team, only in case of 2v2.\n"
-            f"<:gift:1408573743512686623> You have 2 minutes to join.\n"
-            f"<:gift:1408573743512686623> Listen to the Hoster's decision, and don't contest.\n"
-            f"<:gift:1408573743512686623> Open a ticket to claim your prize."
-        ),
-        inline=False
-    )
-    
-    embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956201656193024/Screenshot_20251012-1832592.png")
-    
-    view = TournamentView()
-    tournament.message = await interaction.channel.send(embed=embed, view=view)
-    
     await log_command(interaction.guild.id, interaction.user, "/tournament2v2", f"Mode: 2v2, Max teams: {players}")
     
-    await interaction.response.send_message("✅ Tournament created successfully!", ephemeral=True)
+    await interaction.followup.send("✅ Tournament created successfully!", ephemeral=True)
 
 @bot.command()
 async def code1v1(ctx, member1: discord.Member, member2: discord.Member, *, code: str):
@@ -774,19 +1232,89 @@ async def code1v1(ctx, member1: discord.Member, member2: discord.Member, *, code
     except:
         pass
     
-    user_role_ids = [role.id for role in ctx.author.roles]
-    allowed_roles = [1400926292043628656, 1401996403382816901, 1406684082196185189, 1401555224233246811]
-    
-    if not any(role_id in allowed_roles for role_id in user_role_ids) and not ctx.author.guild_permissions.administrator:
+    if not can(ctx.author, ctx.guild.id, 'staff'):
         return await ctx.send("❌ You don't have permission to send codes.", delete_after=5)
     
+    report = await dm_dispatcher.send([
+        (member1, f"Your room code vs {member2.name} is:\n```{code}```"),
+        (member2, f"Your room code vs {member1.name} is:\n```{code}```")
+    ])
+    await report_code_delivery(ctx, report)
+    await log_command(ctx.guild.id, ctx.author, "!code1v1", f"1v1 code sent: {code}")
+
+@bot.command()
+@guild_actors.serialize
+async def roundcodes(ctx, *codes: str):
     try:
-        await member1.send(f"Your room code vs {member2.name} is:\n```{code}```")
-        await member2.send(f"Your room code vs {member1.name} is:\n```{code}```")
-        await ctx.send("✅ Codes sent via DM!", delete_after=3)
-        await log_command(ctx.guild.id, ctx.author, "!code1v1", f"1v1 code sent: {code}")
-    except discord.Forbidden:
-        await ctx.send("❌ Could not send DM to one or more players. They may have DMs disabled.", delete_after=5)
+        await ctx.message.delete()
+    except:
+        pass
+    
+    if not can(ctx.author, ctx.guild.id, 'staff'):
+        return await ctx.send("❌ You don't have permission to send codes.", delete_after=5)
+    
+    tournament = get_tournament(ctx.guild.id)
+    
+    if not tournament.active:
+        return await ctx.send("❌ No active tournament.", delete_after=5)
+    
+    bracket = tournament.bracket
+    round_number = bracket.round
+    # Decided matches need no room, and a bot entry is a bye with nobody to play.
+    open_matches = [
+        (index, a, b) for index, (a, b) in enumerate(bracket.matches(round_number))
+        if bracket.winner(round_number, index) is None and not is_bot_entry(a) and not is_bot_entry(b)
+    ]
+    
+    if not open_matches:
+        return await ctx.send("❌ No matches in the current round need a room code.", delete_after=5)
+    
+    if codes and len(codes) < len(open_matches):
+        return await ctx.send(f"❌ Round {round_number} has {len(open_matches)} open matches but only {len(codes)} codes were given.", delete_after=10)
+    
+    if not codes:
+        generated = set()
+        while len(generated) < len(open_matches):
+            generated.add(''.join(random.choices(string.ascii_uppercase + string.digits, k=6)))
+        codes = list(generated)
+    
+    def side(entry):
+        return list(entry) if isinstance(entry, list) else [entry]
+    
+    def names(entry):
+        return " & ".join(get_player_display_name(player, ctx.guild.id) for player in side(entry))
+    
+    label = "room" if tournament.mode == "1v1" else "match"
+    messages = []
+    unreachable = []
+    assigned = []
+    for (index, a, b), code in zip(open_matches, codes):
+        assigned.append((index, code))
+        for entry, opponent in ((a, b), (b, a)):
+            for player in side(entry):
+                if isinstance(player, FakePlayer):
+                    continue
+                member = ctx.guild.get_member(player.id)
+                if member is None:
+                    unreachable.append(get_player_display_name(player, ctx.guild.id))
+                    continue
+                messages.append((member, f"Your {label} code vs {names(opponent)} is:\n```{code}```"))
+    
+    record_event(ctx.guild.id, 'codes', round=round_number, codes=assigned)
+    
+    report = await dm_dispatcher.send(messages)
+    
+    summary = f"✅ Sent {len(assigned)} room code(s) for Round {round_number} to {len(report.sent)}/{len(messages) + len(unreachable)} players."
+    if report.failed:
+        summary += f"\nCould not DM: {report.describe_failures()}"
+    if unreachable:
+        summary += f"\nNot in the server: {', '.join(unreachable)}"
+    await ctx.send(summary[:2000], delete_after=30)
+    
+    details = f"Round {round_number}\n" + "\n".join(f"Match {index + 1}: {code}" for index, code in assigned)
+    if len(details) > 1024:
+        details = details[:1021] + "..."
+    await log_command(ctx.guild.id, ctx.author, "!roundcodes", details)
 
 @bot.command()
 async def code2v2(ctx, member1: discord.Member, member2: discord.Member, member3: discord.Member, member4: discord.Member, *, code: str):
@@ -795,24 +1323,20 @@ async def code2v2(ctx, member1: discord.Member, member2: discord.Member, member3
     except:
         pass
     
-    user_role_ids = [role.id for role in ctx.author.roles]
-    allowed_roles = [1400926292043628656, 1401996403382816901, 1406684082196185189, 1401555224233246811]
-    
-    if not any(role_id in allowed_roles for role_id in user_role_ids) and not ctx.author.guild_permissions.administrator:
+    if not can(ctx.author, ctx.guild.id, 'staff'):
         return await ctx.send("❌ You don't have permission to send codes.", delete_after=5)
     
-    try:
-        team1_opponents = f"{member3.name} & {member4.name}"
-        team2_opponents = f"{member1.name} & {member2.name}"
-        
-        await member1.send(f"Your match code vs {team1_opponents} is:\n```{code}```")
-        await member2.send(f"Your match code vs {team1_opponents} is:\n```{code}```")
-        await member3.send(f"Your match code vs {team2_opponents} is:\n```{code}```")
-        await member4.send(f"Your match code vs {team2_opponents} is:\n```{code}```")
-        await ctx.send("✅ Codes sent via DM!", delete_after=3)
-        await log_command(ctx.guild.id, ctx.author, "!code2v2", f"2v2 code sent: {code}")
-    except discord.Forbidden:
-        await ctx.send("❌ Could not send DM to one or more players. They may have DMs disabled.", delete_after=5)
+    team1_opponents = f"{member3.name} & {member4.name}"
+    team2_opponents = f"{member1.name} & {member2.name}"
+    
+    report = await dm_dispatcher.send([
+        (member1, f"Your match code vs {team1_opponents} is:\n```{code}```"),
+        (member2, f"Your match code vs {team1_opponents} is:\n```{code}```"),
+        (member3, f"Your match code vs {team2_opponents} is:\n```{code}```"),
+        (member4, f"Your match code vs {team2_opponents} is:\n```{code}```")
+    ])
+    await report_code_delivery(ctx, report)
+    await log_command(ctx.guild.id, ctx.author, "!code2v2", f"2v2 code sent: {code}")
 
 @bot.command()
 async def tourping(ctx, region: str, *, message: str):
@@ -821,10 +1345,7 @@ async def tourping(ctx, region: str, *, message: str):
     except:
         pass
     
-    user_role_ids = [role.id for role in ctx.author.roles]
-    allowed_roles = [1400926292043628656, 1401996403382816901, 1406684082196185189, 1401555224233246811]
-    
-    if not any(role_id in allowed_roles for role_id in user_role_ids) and not ctx.author.guild_permissions.administrator:
+    if not can(ctx.author, ctx.guild.id, 'staff'):
         return await ctx.send("❌ You don't have permission to use this command.", delete_after=5)
     
     region_roles = {
@@ -849,18 +1370,21 @@ async def tourping(ctx, region: str, *, message: str):
     await log_command(ctx.guild.id, ctx.author, "!tourping", f"Region: {region}, Message: {message}")
 
 @bot.command()
+@guild_actors.serialize
 async def start(ctx):
     try:
         await ctx.message.delete()
     except:
         pass
     
-    if not has_permission(ctx.author, ctx.guild.id, 'tlr') and not ctx.author.guild_permissions.manage_channels:
+    if not can(ctx.author, ctx.guild.id, 'tlr'):
         return await ctx.send("❌ You don't have permission to start tournaments.", delete_after=5)
     
     tournament = get_tournament(ctx.guild.id)
     
-    await log_command(ctx.guild.id, ctx.author, "!start", f"Players: {len(tournament.players)}")
+    registered_players = tournament.registration.players()
+    
+    await log_command(ctx.guild.id, ctx.author, "!start", f"Players: {len(registered_players)}")
     
     if tournament.max_players == 0:
         return await ctx.send("❌ No tournament has been created yet.", delete_after=5)
@@ -868,162 +1392,57 @@ async def start(ctx):
     if tournament.active:
         return await ctx.send("❌ Tournament already started.", delete_after=5)
     
-    if len(tournament.players) < 2:
+    if len(registered_players) < 2:
         return await ctx.send("❌ Not enough players to start tournament (minimum 2 players).", delete_after=5)
     
-    if tournament.mode == "2v2":
-        current_teams = len(tournament.players) // 2
-        bots_added = 0
-        while current_teams % 2 != 0:
-            bot1_name = f"Bot{tournament.fake_count}"
-            bot1_id = 761557952975420886 + tournament.fake_count
-            bot1 = FakePlayer(bot1_name, bot1_id)
-            tournament.fake_count += 1
-            
-            bot2_name = f"Bot{tournament.fake_count}"
-            bot2_id = 761557952975420886 + tournament.fake_count
-            bot2 = FakePlayer(bot2_name, bot2_id)
-            tournament.fake_count += 1
-            
-            tournament.players.extend([bot1, bot2])
-            current_teams += 1
-            bots_added += 1
-        
-        if bots_added > 0:
-            await ctx.send(f"Adding {bots_added} bot team(s) to make even bracket...", delete_after=5)
-        
-        team_groups = []
-        processed_players = set()
-        
-        for player in tournament.players:
-            if player in processed_players or isinstance(player, FakePlayer):
-                continue
-            
-            team_id = get_team_id(ctx.guild.id, player.id)
-            if team_id:
-                teammate = get_teammate(ctx.guild.id, player.id)
-                if teammate and teammate in tournament.players:
-                    team_groups.append([player, teammate])
-                    processed_players.add(player)
-                    processed_players.add(teammate)
-                else:
-                    team_groups.append([player])
-                    processed_players.add(player)
-            else:
-                team_groups.append([player])
-                processed_players.add(player)
-        
-        fake_players = [p for p in tournament.players if isinstance(p, FakePlayer)]
-        for i in range(0, len(fake_players), 2):
-            if i + 1 < len(fake_players):
-                team_groups.append([fake_players[i], fake_players[i+1]])
-        
-        random.shuffle(team_groups)
-        tournament.players = []
-        for team in team_groups:
-            tournament.players.extend(team)
-    
-    else:
-        bots_added = 0
-        while len(tournament.players) % 2 != 0:
-            bot_name = f"Bot{tournament.fake_count}"
-            bot_id = 761557952975420886 + tournament.fake_count
-            bot = FakePlayer(bot_name, bot_id)
-            tournament.players.append(bot)
-            tournament.fake_count += 1
-            bots_added += 1
-        
-        if bots_added > 0:
-            await ctx.send(f"Adding {bots_added} bot player(s) to make even bracket...", delete_after=5)
-        
-        random.shuffle(tournament.players)
-    
-    tournament.active = True
-    tournament.results = []
-    tournament.rounds = []
+    fake_count = tournament.fake_count
     
     if tournament.mode == "2v2":
-        team_pairs = []
-        for i in range(0, len(tournament.players), 4):
-            team_a = [tournament.players[i], tournament.players[i+1]]
-            team_b = [tournament.players[i+2], tournament.players[i+3]]
-            team_pairs.append((team_a, team_b))
-        tournament.rounds.append(team_pairs)
-        current_round = team_pairs
+        entries = tournament.registration.teams()
     else:
-        round_pairs = [(tournament.players[i], tournament.players[i+1]) for i in range(0, len(tournament.players), 2)]
-        tournament.rounds.append(round_pairs)
-        current_round = round_pairs
+        entries = registered_players
+    
+    bracket_size = 2
+    while bracket_size < len(entries):
+        bracket_size *= 2
+    
+    bots = []
+    while len(entries) + len(bots) < bracket_size:
+        if tournament.mode == "2v2":
+            bot1 = FakePlayer(f"Bot{fake_count}", 761557952975420886 + fake_count)
+            bot2 = FakePlayer(f"Bot{fake_count + 1}", 761557952975420886 + fake_count + 1)
+            bots.append([bot1, bot2])
+            fake_count += 2
+        else:
+            bots.append(FakePlayer(f"Bot{fake_count}", 761557952975420886 + fake_count))
+            fake_count += 1
     
-    embed = discord.Embed(
-        title=f"<:trophy:1408575094409662474>{tournament.title} - Round 1",
-        color=0x3498db
-    )
+    if bots:
+        unit = "bot team(s)" if tournament.mode == "2v2" else "bot player(s)"
+        await ctx.send(f"Adding {len(bots)} {unit} to fill the bracket...", delete_after=5)
     
-    if tournament.mode == "2v2":
-        for i, match in enumerate(current_round, 1):
-            team_a, team_b = match
-            team_a_display = []
-            team_b_display = []
-            
-            guild_str = str(ctx.guild.id)
-            
-            for player in team_a:
-                player_name = get_player_display_name(player, ctx.guild.id)
-                if guild_str in bracket_roles and str(player.id) in bracket_roles[guild_str] and not isinstance(player, FakePlayer):
-                    emojis = ''.join(bracket_roles[guild_str][str(player.id)])
-                    player_name = f"{player_name} {emojis}"
-                team_a_display.append(player_name)
-            
-            for player in team_b:
-                player_name = get_player_display_name(player, ctx.guild.id)
-                if guild_str in bracket_roles and str(player.id) in bracket_roles[guild_str] and not isinstance(player, FakePlayer):
-                    emojis = ''.join(bracket_roles[guild_str][str(player.id)])
-                    player_name = f"{player_name} {emojis}"
-                team_b_display.append(player_name)
-            
-            team_a_str = " & ".join(team_a_display)
-            team_b_str = " & ".join(team_b_display)
-            
-            embed.add_field(
-                name=f"<:Abilitys:1401884706219495514> Match {i}",
-                value=f"{team_a_str} <:vs:1400922770774163456> {team_b_str}",
-                inline=False
-            )
-    else:
-        for i, match in enumerate(current_round, 1):
-            a, b = match
-            player_a = get_player_display_name(a, ctx.guild.id)
-            player_b = get_player_display_name(b, ctx.guild.id)
-            
-            guild_str = str(ctx.guild.id)
-            if guild_str in bracket_roles and str(a.id) in bracket_roles[guild_str] and not isinstance(a, FakePlayer):
-                emojis = ''.join(bracket_roles[guild_str][str(a.id)])
-                player_a = f"{player_a} {emojis}"
-            
-            if guild_str in bracket_roles and str(b.id) in bracket_roles[guild_str] and not isinstance(b, FakePlayer):
-                emojis = ''.join(bracket_roles[guild_str][str(b.id)])
-                player_b = f"{player_b} {emojis}"
-            
-            embed.add_field(
-                name=f"<:Abilitys:1401884706219495514> Match {i}",
-                value=f"{player_a} <:vs:1400922770774163456> {player_b}",
-                inline=False
-            )
+    # Padding bots each get a real opponent in round 1 so they act as byes.
+    random.shuffle(entries)
+    pairs = list(zip(entries, bots))
+    rest = entries[len(bots):]
+    pairs.extend(zip(rest[0::2], rest[1::2]))
+    random.shuffle(pairs)
+    entrants = [entry for pair in pairs for entry in pair]
     
-    embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956177497133066/Screenshot_20251012-1832542.png")
+    record_event(ctx.guild.id, 'started', entrants=entrants, fake_count=fake_count)
+    advance_bot_matches(ctx.guild.id)
     
-    winners_view = WinnersView(ctx.guild.id)
-    tournament.message = await ctx.send(embed=embed, view=winners_view)
+    await announce_round(ctx, tournament)
 
 @bot.command()
+@guild_actors.serialize
 async def restart(ctx):
     try:
         await ctx.message.delete()
     except:
         pass
     
-    if not has_permission(ctx.author, ctx.guild.id, 'tlr') and not ctx.author.guild_permissions.manage_channels:
+    if not can(ctx.author, ctx.guild.id, 'tlr'):
         return await ctx.send("❌ You don't have permission to restart tournaments.", delete_after=5)
     
     tournament = get_tournament(ctx.guild.id)
@@ -1031,12 +1450,13 @@ async def restart(ctx):
     if tournament.max_players == 0:
         return await ctx.send("❌ No tournament has been created yet.", delete_after=5)
     
-    tournament.__init__()
+    record_event(ctx.guild.id, 'reset')
     
     await ctx.send("✅ Tournament has been restarted! You can create a new tournament now.", delete_after=10)
     await log_command(ctx.guild.id, ctx.author, "!restart", "Tournament reset")
 
 @bot.command()
+@guild_actors.serialize
 async def winner(ctx, member: discord.Member):
     try:
         await ctx.message.delete()
@@ -1044,10 +1464,7 @@ async def winner(ctx, member: discord.Member):
         print(f"Failed to delete message: {e}")
         pass
     
-    user_role_ids = [role.id for role in ctx.author.roles]
-    allowed_roles = [1400926292043628656, 1401996403382816901, 1406684082196185189, 1401555224233246811]
-    
-    if not any(role_id in allowed_roles for role_id in user_role_ids) and not ctx.author.guild_permissions.administrator:
+    if not can(ctx.author, ctx.guild.id, 'staff'):
         return await ctx.send("❌ You don't have permission to set winners.", delete_after=5)
     
     tournament = get_tournament(ctx.guild.id)
@@ -1055,207 +1472,109 @@ async def winner(ctx, member: discord.Member):
     if not tournament.active:
         return await ctx.send("❌ No active tournament.", delete_after=5)
     
-    current_round = tournament.rounds[-1]
+    bracket = tournament.bracket
+    match = bracket.match_of(member.id)
     
-    match_found = False
-    eliminated_players = []
-    match_index = -1
-    winner_team = None
-    loser_team = None
-    winner_name = ""
+    if match is None or match[0] < bracket.round:
+        return await ctx.send("❌ This player/team is not in the current round.", delete_after=5)
     
-    if tournament.mode == "2v2":
-        member_team_id = get_team_id(ctx.guild.id, member.id)
-        if not member_team_id:
-            return await ctx.send("❌ This player is not in a team.", delete_after=5)
-        
-        member_team = get_team_members(ctx.guild.id, member_team_id)
-        
-        for i, match in enumerate(current_round):
-            team_a, team_b = match
-            if member in team_a:
-                winner_team = team_a
-                loser_team = team_b
-                tournament.results.append(team_a)
-                eliminated_players.extend(team_b)
-                match_found = True
-                match_index = i
-                break
-            elif member in team_b:
-                winner_team = team_b
-                loser_team = team_a
-                tournament.results.append(team_b)
-                eliminated_players.extend(team_a)
-                match_found = True
-                match_index = i
-                break
-        
-        if match_found:
-            winner_name = get_team_display_name(ctx.guild.id, winner_team)
-            round_number = len(tournament.rounds)
-            match_key = f"round_{round_number}_match_{match_index + 1}"
-            tournament.match_winners[match_key] = winner_team
+    round_number, match_index = match
+    if round_number > bracket.round or bracket.winner(round_number, match_index) is not None:
+        return await ctx.send("❌ This match already has a winner.", delete_after=5)
+    
+    record_event(ctx.guild.id, 'winner', player_id=member.id)
+    refresh_match_page(ctx.guild.id, tournament, round_number, match_index)
+    advance_bot_matches(ctx.guild.id, bracket.node(round_number, match_index))
     
+    winner_entry = bracket.winner(round_number, match_index)
+    if tournament.mode == "2v2":
+        winner_name = get_team_display_name(ctx.guild.id, winner_entry)
     else:
-        for i, match in enumerate(current_round):
-            a, b = match
-            if member == a or member == b:
-                tournament.results.append(member)
-                eliminated_players.extend([a if member == b else b])
-                match_found = True
-                match_index = i
-                break
-        
-        if match_found:
-            winner_name = get_player_display_name(member, ctx.guild.id)
-            round_number = len(tournament.rounds)
-            match_key = f"round_{round_number}_match_{match_index + 1}"
-            tournament.match_winners[match_key] = member
+        winner_name = get_player_display_name(winner_entry, ctx.guild.id)
     
-    if not match_found:
-        return await ctx.send("❌ This player/team is not in the current round.", delete_after=5)
+    await announce_progress(ctx, tournament, round_number)
     
-    tournament.eliminated.extend(eliminated_players)
+    await ctx.send(f"✅ {winner_name} wins their match!", delete_after=5)
+
+@bot.command()
+@guild_actors.serialize
+async def winners(ctx, members: commands.Greedy[discord.Member], *, unparsed: str = ""):
+    try:
+        await ctx.message.delete()
+    except Exception as e:
+        print(f"Failed to delete message: {e}")
+        pass
     
-    if len(tournament.results) == len(current_round):
-        if len(tournament.results) == 1:
-            winner_data = tournament.results[0]
-            
-            all_eliminated = tournament.eliminated
-            
-            placements = []
-            
-            placements.append((1, winner_data))
-            
-            if len(all_eliminated) >= 1:
-                placements.append((2, all_eliminated[-1]))
-            
-            if len(all_eliminated) >= 2:
-                placements.append((3, all_eliminated[-2]))
-            if len(all_eliminated) >= 3:
-                placements.append((4, all_eliminated[-3]))
-            
-            embed = discord.Embed(color=0xffd700)
-            results_display = "<:Leaderboard:1406282721436762244>Top 4<:Leaderboard:1406282721436762244>\n"
-            
-            for place, player_obj in placements[:4]:
-                if tournament.mode == "2v2" and isinstance(player_obj, list):
-                    player_str = get_team_display_name(ctx.guild.id, player_obj)
-                else:
-                    player_str = get_player_display_name(player_obj, ctx.guild.id)
-                if place == 1:
-                    results_display += f"<a:1st:1413906428850344028>1st: {player_str}\n"
-                elif place == 2:
-                    results_display += f"<a:2nd_animated:1413906496164724968>2nd: {player_str}\n"
-                elif place == 3:
-                    results_display += f"<a:3rd_animated:1413906557997154385>3rd: {player_str}\n"
-                elif place == 4:
-                    results_display += f"<:TimeTrial:1401999416688382096>4th: {player_str}\n"
-            
-            results_display += "\n<:star:1413871338803822684>Congrats!\n"
-            
-            results_display += f"\n<:Crown:1400924187325104258> **Prizes**\n"
-            results_display += f"<a:1st:1413906428850344028> 1st: {tournament.prize_1st}\n"
-            results_display += f"<a:2nd_animated:1413906496164724968> 2nd: {tournament.prize_2nd}\n"
-            results_display += f"<a:3rd_animated:1413906557997154385> 3rd: {tournament.prize_3rd}\n"
-            results_display += f"<:TimeTrial:1401999416688382096> 4th: {tournament.prize_4th}"
-            
-            embed.add_field(name="\u200b", value=results_display, inline=False)
-            embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956154688377002/Screenshot_20251012-1832422.png")
-            
-            completed_view = discord.ui.View()
-            await ctx.send(embed=embed, view=completed_view)
-            
-            tournament.__init__()
+    if not can(ctx.author, ctx.guild.id, 'staff'):
+        return await ctx.send("❌ You don't have permission to set winners.", delete_after=5)
+    
+    tournament = get_tournament(ctx.guild.id)
+    
+    if not tournament.active:
+        return await ctx.send("❌ No active tournament.", delete_after=5)
+    
+    # Greedy stops at the first argument that isn't a member and leaves the
+    # rest here; recording only the part before it would be a silent loss.
+    if unparsed:
+        return await ctx.send(f"❌ No results were recorded: couldn't find a member in `{unparsed[:100]}`.", delete_after=15)
+    if not members:
+        return await ctx.send("❌ Usage: `!winners @winner1 @winner2 ...`", delete_after=5)
+    
+    bracket = tournament.bracket
+    round_number = bracket.round
+    picked = {}
+    problems = []
+    
+    # Everything is checked before anything is recorded, so a bad mention
+    # leaves the round untouched.
+    for member in {member.id: member for member in members}.values():
+        match = bracket.match_of(member.id)
+        if match is None or match[0] < round_number:
+            problems.append(f"{member.mention} is not in the current round.")
+        elif match[0] > round_number or bracket.winner(*match) is not None:
+            problems.append(f"{member.mention}'s match already has a winner.")
+        elif match[1] in picked:
+            # Naming both players of a 2v2 team is one pick, not two.
+            if bracket.position[member.id] != bracket.position[picked[match[1]].id]:
+                problems.append(f"{member.mention} and {picked[match[1]].mention} are in the same match.")
         else:
-            next_round_winners = tournament.results.copy()
-            
-            while len(next_round_winners) % 2 != 0:
-                bot_name = f"Bot{tournament.fake_count}"
-                bot_id = 761557952975420886 + tournament.fake_count
-                bot = FakePlayer(bot_name, bot_id)
-                next_round_winners.append(bot)
-                tournament.fake_count += 1
-            
-            next_round_pairs = []
-            for i in range(0, len(next_round_winners), 2):
-                next_round_pairs.append((next_round_winners[i], next_round_winners[i+1]))
-            
-            tournament.rounds.append(next_round_pairs)
-            tournament.results = []
-            
-            round_num = len(tournament.rounds)
-            embed = discord.Embed(
-                title=f"<:trophy:1408575094409662474>{tournament.title} - Round {round_num}",
-                color=0x3498db
-            )
-            
-            if tournament.mode == "2v2":
-                for i, match in enumerate(next_round_pairs, 1):
-                    team_a, team_b = match
-                    team_a_display = []
-                    team_b_display = []
-                    
-                    guild_str = str(ctx.guild.id)
-                    
-                    for player in team_a:
-                        player_name = get_player_display_name(player, ctx.guild.id)
-                        if guild_str in bracket_roles and str(player.id) in bracket_roles[guild_str] and not isinstance(player, FakePlayer):
-                            emojis = ''.join(bracket_roles[guild_str][str(player.id)])
-                            player_name = f"{player_name} {emojis}"
-                        team_a_display.append(player_name)
-                    
-                    for player in team_b:
-                        player_name = get_player_display_name(player, ctx.guild.id)
-                        if guild_str in bracket_roles and str(player.id) in bracket_roles[guild_str] and not isinstance(player, FakePlayer):
-                            emojis = ''.join(bracket_roles[guild_str][str(player.id)])
-                            player_name = f"{player_name} {emojis}"
-                        team_b_display.append(player_name)
-                    
-                    team_a_str = " & ".join(team_a_display)
-                    team_b_str = " & ".join(team_b_display)
-                    
-                    embed.add_field(
-                        name=f"<:Abilitys:1401884706219495514> Match {i}",
-                        value=f"{team_a_str} <:vs:1400922770774163456> {team_b_str}",
-                        inline=False
-                    )
-            else:
-                for i, match in enumerate(next_round_pairs, 1):
-                    a, b = match
-                    player_a = get_player_display_name(a, ctx.guild.id)
-                    player_b = get_player_display_name(b, ctx.guild.id)
-                    
-                    guild_str = str(ctx.guild.id)
-                    if guild_str in bracket_roles and str(a.id) in bracket_roles[guild_str] and not isinstance(a, FakePlayer):
-                        emojis = ''.join(bracket_roles[guild_str][str(a.id)])
-                        player_a = f"{player_a} {emojis}"
-                    
-                    if guild_str in bracket_roles and str(b.id) in bracket_roles[guild_str] and not isinstance(b, FakePlayer):
-                        emojis = ''.join(bracket_roles[guild_str][str(b.id)])
-                        player_b = f"{player_b} {emojis}"
-                    
-                    embed.add_field(
-                        name=f"<:Abilitys:1401884706219495514> Match {i}",
-                        value=f"{player_a} <:vs:1400922770774163456> {player_b}",
-                        inline=False
-                    )
-            
-            embed.set_image(url="https://cdn.discordapp.com/attachments/1407790385685598270/1426956177497133066/Screenshot_20251012-1832542.png")
-            
-            next_round_winners_view = WinnersView(ctx.guild.id)
-            tournament.message = await ctx.send(embed=embed, view=next_round_winners_view)
+            picked[match[1]] = member
+    
+    if problems:
+        shown = "\n".join(problems[:10])
+        if len(problems) > 10:
+            shown += f"\n...and {len(problems) - 10} more."
+        return await ctx.send(f"❌ No results were recorded:\n{shown}", delete_after=15)
+    
+    names = []
+    for match_index in sorted(picked):
+        record_event(ctx.guild.id, 'winner', player_id=picked[match_index].id)
+        refresh_match_page(ctx.guild.id, tournament, round_number, match_index)
+        advance_bot_matches(ctx.guild.id, bracket.node(round_number, match_index))
+        winner_entry = bracket.winner(round_number, match_index)
+        if tournament.mode == "2v2":
+            names.append(f"Match {match_index + 1}: {get_team_display_name(ctx.guild.id, winner_entry)}")
+        else:
+            names.append(f"Match {match_index + 1}: {get_player_display_name(winner_entry, ctx.guild.id)}")
     
-    await ctx.send(f"✅ {winner_name} wins their match!", delete_after=5)
+    details = f"Round {round_number}\n" + "\n".join(names)
+    if len(details) > 1024:
+        details = details[:1021] + "..."
+    await log_command(ctx.guild.id, ctx.author, "!winners", details)
+    
+    await announce_progress(ctx, tournament, round_number)
+    
+    await ctx.send(f"✅ Recorded {len(picked)} result(s) for Round {round_number}.", delete_after=5)
 
 @bot.command()
+@guild_actors.serialize
 async def fake(ctx, number: int = 1):
     try:
         await ctx.message.delete()
     except:
         pass
     
-    if not has_permission(ctx.author, ctx.guild.id, 'tlr') and not ctx.author.guild_permissions.manage_channels:
+    if not can(ctx.author, ctx.guild.id, 'tlr'):
         return await ctx.send("❌ You don't have permission to add fake players.", delete_after=5)
     
     tournament = get_tournament(ctx.guild.id)
@@ -1269,17 +1588,24 @@ async def fake(ctx, number: int = 1):
     if number < 1 or number > 10:
         return await ctx.send("❌ Number must be between 1 and 10.", delete_after=5)
     
+    entries = []
+    fake_count = tournament.fake_count
+    team_size = 2 if tournament.mode == "2v2" else 1
     for _ in range(number):
-        if len(tournament.players) >= tournament.max_players:
+        if len(tournament.registration) + len(entries) >= tournament.max_players:
             break
         
-        bot_name = f"Bot{tournament.fake_count}"
-        bot_id = 761557952975420886 + tournament.fake_count
-        bot = FakePlayer(bot_name, bot_id)
-        tournament.players.append(bot)
-        tournament.fake_count += 1
+        bots = []
+        for _ in range(team_size):
+            bot_name = f"Bot{fake_count}"
+            bot_id = 761557952975420886 + fake_count
+            bots.append(FakePlayer(bot_name, bot_id))
+            fake_count += 1
+        entries.append((bots[0].id, bots))
     
-    await ctx.send(f"✅ Added {number} fake player(s)! Current players: {len(tournament.players)}/{tournament.max_players}", delete_after=10)
+    record_event(ctx.guild.id, 'registered', entries=entries, fake_count=fake_count)
+    
+    await ctx.send(f"✅ Added {number} fake player(s)! Current players: {len(tournament.registration)}/{tournament.max_players}", delete_after=10)
     await log_command(ctx.guild.id, ctx.author, "!fake", f"Added {number} fake players")
 
 @bot.command()
@@ -1289,10 +1615,7 @@ async def hosterregist(ctx, max_hosters: int):
     except:
         pass
     
-    user_role_ids = [role.id for role in ctx.author.roles]
-    allowed_roles = [1401996403382816901, 1406684082196185189, 1401555224233246811]
-    
-    if not any(role_id in allowed_roles for role_id in user_role_ids) and not ctx.author.guild_permissions.administrator:
+    if not can(ctx.author, ctx.guild.id, 'hoster_admin'):
         return await ctx.send("❌ You don't have permission to start host registration.", delete_after=5)
     
     host_registrations['active'] = True
@@ -1323,34 +1646,10 @@ async def alllogs(ctx, channel: discord.TextChannel):
     except:
         pass
     
-    guild_str = str(ctx.guild.id)
-    log_channels[guild_str] = channel.id
-    save_data()
+    set_log_channel(ctx.guild.id, channel.id)
     
-    embed = discord.Embed(
-        title="<:bracketrole:1413196441564315810> Bracket Roles",
-        color=0x9b59b6
-    )
-    
-    if guild_str in bracket_roles and bracket_roles[guild_str]:
-        roles_text = ""
-        for user_id, emojis in bracket_roles[guild_str].items():
-            try:
-                member = ctx.guild.get_member(int(user_id))
-                if member:
-                    emojis_str = ''.join(emojis)
-                    roles_text += f"{member.mention}: {emojis_str}\n"
-            except:
-                pass
-        
-        if roles_text:
-            embed.description = roles_text
-        else:
-            embed.description = "No bracket roles assigned yet."
-    else:
-        embed.description = "No bracket roles assigned yet."
-    
-    await channel.send(embed=embed)
+    message_ids = await publish_bracket_roles(ctx.guild, channel, [])
+    set_bracket_roles_messages(ctx.guild.id, channel.id, message_ids)
     
     await ctx.send(f"✅ Logs channel set to {channel.mention}", delete_after=10)
     await log_command(ctx.guild.id, ctx.author, "!alllogs", f"Logs channel set to {channel.mention}")
@@ -1364,20 +1663,13 @@ async def bracketrole(ctx, member: discord.Member, emoji1: str, emoji2: str = ""
     except:
         pass
     
-    guild_str = str(ctx.guild.id)
-    user_str = str(member.id)
-    
-    if guild_str not in bracket_roles:
-        bracket_roles[guild_str] = {}
-    
     emojis = [emoji1]
     if emoji2:
         emojis.append(emoji2)
     if emoji3:
         emojis.append(emoji3)
     
-    bracket_roles[guild_str][user_str] = emojis
-    save_data()
+    set_bracket_role(ctx.guild.id, member.id, emojis)
     
     await ctx.send(f"✅ Bracket role set for {member.name}: {' '.join(emojis)}", delete_after=10)
     await log_command(ctx.guild.id, ctx.author, "!bracketrole", f"Set bracket role for {member.name}")
@@ -1393,20 +1685,17 @@ async def bracketrolereset(ctx, member: discord.Member = None):
     except:
         pass
     
-    guild_str = str(ctx.guild.id)
+    guild_roles = get_bracket_roles(ctx.guild.id)
     
     if member:
-        user_str = str(member.id)
-        if guild_str in bracket_roles and user_str in bracket_roles[guild_str]:
-            del bracket_roles[guild_str][user_str]
-            save_data()
+        if str(member.id) in guild_roles:
+            delete_bracket_role(ctx.guild.id, member.id)
             await ctx.send(f"✅ Bracket role reset for {member.name}", delete_after=10)
         else:
             await ctx.send(f"❌ {member.name} has no bracket role.", delete_after=5)
     else:
-        if guild_str in bracket_roles:
-            bracket_roles[guild_str] = {}
-            save_data()
+        if guild_roles:
+            clear_bracket_roles(ctx.guild.id)
             await ctx.send("✅ All bracket roles reset.", delete_after=10)
         else:
             await ctx.send("❌ No bracket roles to reset.", delete_after=5)
@@ -1428,10 +1717,6 @@ async def invite(ctx, member: discord.Member):
     if member.bot:
         return await ctx.send("❌ You cannot invite bots.", delete_after=5)
     
-    guild_str = str(ctx.guild.id)
-    author_str = str(ctx.author.id)
-    member_str = str(member.id)
-    
     author_team_id = get_team_id(ctx.guild.id, ctx.author.id)
     if author_team_id:
         return await ctx.send("❌ You are already in a team. Use `!leave_team` first.", delete_after=5)
@@ -1440,24 +1725,17 @@ async def invite(ctx, member: discord.Member):
     if member_team_id:
         return await ctx.send(f"❌ {member.name} is already in a team.", delete_after=5)
     
-    if guild_str not in team_invitations:
-        team_invitations[guild_str] = {}
-    
-    if member_str not in team_invitations[guild_str]:
-        team_invitations[guild_str][member_str] = []
-    
-    if ctx.author.id in team_invitations[guild_str][member_str]:
+    if not get_teams(ctx.guild.id).invite(ctx.author.id, member.id):
         return await ctx.send(f"❌ You already sent an invitation to {member.name}.", delete_after=5)
     
-    team_invitations[guild_str][member_str].append(ctx.author.id)
+    invite_view = InviteView(ctx.author, ctx.guild.id)
+    report = await dm_dispatcher.send([(member, f"{ctx.author.name} invited you to be their teammate!", {'view': invite_view})])
+    if report.failed:
+        get_teams(ctx.guild.id).clear_invitation(ctx.author.id, member.id)
+        return await ctx.send(f"❌ Cannot send DM to {member.name}. They may have DMs disabled.", delete_after=10)
     
-    try:
-        invite_view = InviteView(ctx.author, ctx.guild.id)
-        await member.send(f"{ctx.author.name} invited you to be their teammate!", view=invite_view)
-        await ctx.send(f"✅ Invitation sent to {member.name} via DM!", delete_after=10)
-        await log_command(ctx.guild.id, ctx.author, "!invite", f"Sent invitation to {member.name}")
-    except discord.Forbidden:
-        await ctx.send(f"❌ Cannot send DM to {member.name}. They may have DMs disabled.", delete_after=10)
+    await ctx.send(f"✅ Invitation sent to {member.name} via DM!", delete_after=10)
+    await log_command(ctx.guild.id, ctx.author, "!invite", f"Sent invitation to {member.name}")
 
 @bot.command()
 async def leave_team(ctx):
@@ -1481,6 +1759,27 @@ async def leave_team(ctx):
     else:
         await ctx.send("✅ You left your team.", delete_after=10)
 
+@bot.command()
+async def profiling(ctx, mode: str = "status"):
+    # Affects the whole process, not just this guild, so it's owner-only.
+    if not await bot.is_owner(ctx.author):
+        return await ctx.send("❌ Only the bot owner can change profiling.", delete_after=5)
+    
+    mode = mode.lower()
+    if mode == "on":
+        profiler.enabled = True
+    elif mode == "off":
+        profiler.enabled = False
+        profiler.cprofile = False
+    elif mode == "cprofile":
+        profiler.enabled = True
+        profiler.cprofile = True
+    elif mode != "status":
+        return await ctx.send("❌ Usage: !profiling on|off|cprofile|status", delete_after=5)
+    
+    state = "off" if not profiler.enabled else "on (wall time + cProfile)" if profiler.cprofile else "on (wall time)"
+    await ctx.send(f"🔧 Profiling is {state}. Slow threshold: {profiler.threshold}s, profiles kept in `{profiler.directory}`.", delete_after=15)
+
 @bot.command()
 async def update(ctx):
     try:
@@ -1491,43 +1790,14 @@ async def update(ctx):
     if not ctx.author.guild_permissions.manage_guild:
         return await ctx.send("❌ You don't have permission to update logs.", delete_after=5)
     
-    guild_str = str(ctx.guild.id)
-    
-    if guild_str in log_channels:
+    if get_log_channel(ctx.guild.id):
         await auto_update_alllogs(ctx.guild)
         await ctx.send("✅ Logs updated!", delete_after=5)
     else:
-        channel = ctx.channel
-        async for message in channel.history(limit=100):
-            if message.author == bot.user and message.embeds:
-                embed = message.embeds[0]
-                if embed.title and "Bracket Roles" in embed.title:
-                    new_embed = discord.Embed(
-                        title="<:bracketrole:1413196441564315810> Bracket Roles",
-                        color=0x9b59b6
-                    )
-                    
-                    if guild_str in bracket_roles and bracket_roles[guild_str]:
-                        roles_text = ""
-                        for user_id, emojis in bracket_roles[guild_str].items():
-                            try:
-                                member = ctx.guild.get_member(int(user_id))
-                                if member:
-                                    emojis_str = ''.join(emojis)
-                                    roles_text += f"{member.mention}: {emojis_str}\n"
-                            except:
-                                pass
-                        
-                        if roles_text:
-                            new_embed.description = roles_text
-                        else:
-                            new_embed.description = "No bracket roles assigned yet."
-                    else:
-                        new_embed.description = "No bracket roles assigned yet."
-                    
-                    await message.edit(embed=new_embed)
-                    await ctx.send("✅ Logs updated!", delete_after=5)
-                    return
+        message = await find_bracket_roles_message(ctx.channel, 100)
+        if message:
+            await publish_bracket_roles(ctx.guild, ctx.channel, [message.id])
+            return await ctx.send("✅ Logs updated!", delete_after=5)
         
         await ctx.send("❌ No bracket roles message found in this channel.", delete_after=5)
 
@@ -1553,6 +1823,9 @@ if __name__ == '__main__':
         print('Please set your Discord bot token in the Secrets tab.')
         exit(1)
     
+    load_data()
+    profiler.install(bot, after_view=observe_interaction_ack)
+    
     try:
         bot.run(TOKEN)
     except discord.PrivilegedIntentsRequired:
@@ -1570,3 +1843,6 @@ if __name__ == '__main__':
         print('6. Save changes and restart the bot')
         print('='*60 + '\n')
         exit(1)
+    finally:
+        bracket_images.close()
+        store.close()
@@ -0,0 +1,98 @@
+import threading
+
+# Latency buckets in seconds, from a fast ack up to a stuck handler.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.registry.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.registry.lock:
+            self.values[labels] = value
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def observe(self, value, *labels):
+        with self.registry.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * len(BUCKETS), 0, 0.0]
+            buckets = entry[0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def samples(self):
+        for labels, (buckets, count, total) in self.values.items():
+            for bound, bucket_count in zip(BUCKETS, buckets):
+                yield f"{self.name}_bucket{format_labels(self.labelnames, labels, [('le', bound)])} {bucket_count}"
+            yield f"{self.name}_bucket{format_labels(self.labelnames, labels, [('le', '+Inf')])} {count}"
+            yield f"{self.name}_count{format_labels(self.labelnames, labels)} {count}"
+            yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}"
+
+class Registry:
+    # Mostly written from the event loop, but the loop watchdog counts stalls
+    # from its own thread; the lock keeps a scrape from seeing a half-updated
+    # histogram.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(self, name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(self, name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=()):
+        return self._add(Histogram(self, name, help, labelnames))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
@@ -0,0 +1,113 @@
+import asyncio
+from collections import deque
+
+import discord
+
+BRACKET = 0
+BACKGROUND = 1
+
+class OutboundQueue:
+    # Outbound requests wait here by priority class. Each bucket (a channel
+    # id, the unit Discord rate-limits message traffic by) has at most one
+    # request in flight so per-channel order holds, and a bucket that got a
+    # 429 sits out its retry_after while other buckets keep moving.
+    # Bracket traffic is otherwise only bounded by concurrency, set near
+    # Discord's global budget; background traffic gets a few slots of its
+    # own so a flood of logs can't crowd it out.
+    def __init__(self, concurrency=50, background_slots=4, max_retries=3):
+        self.concurrency = concurrency
+        self.background_slots = background_slots
+        self.max_retries = max_retries
+        self.waiting = (deque(), deque())
+        self.busy = set()
+        self.blocked = {}
+        self.in_flight = 0
+        self.background_in_flight = 0
+        self.wakeup = None
+
+    def __len__(self):
+        return sum(len(jobs) for jobs in self.waiting)
+
+    def submit(self, priority, bucket, factory):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[priority].append((bucket, factory, future, 0))
+        self._pump()
+        return future
+
+    async def run(self, priority, bucket, factory):
+        return await self.submit(priority, bucket, factory)
+
+    def _next_job(self):
+        now = asyncio.get_running_loop().time()
+        for priority, jobs in enumerate(self.waiting):
+            if priority == BACKGROUND and self.background_in_flight >= self.background_slots:
+                continue
+            for job in jobs:
+                bucket = job[0]
+                if bucket in self.busy or self.blocked.get(bucket, 0) > now or self.blocked.get(None, 0) > now:
+                    continue
+                jobs.remove(job)
+                return priority, job
+        return None
+
+    def _pump(self):
+        while self.in_flight < self.concurrency:
+            picked = self._next_job()
+            if picked is None:
+                break
+            priority, (bucket, factory, future, attempts) = picked
+            self.in_flight += 1
+            if priority == BACKGROUND:
+                self.background_in_flight += 1
+            self.busy.add(bucket)
+            asyncio.create_task(self._send(priority, bucket, factory, future, attempts))
+        self._schedule_wakeup()
+
+    def _schedule_wakeup(self):
+        # Blocked buckets have nothing to wake them, so come back when the
+        # earliest block lifts.
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        pending = [until for until in self.blocked.values() if until > now]
+        if self.wakeup is not None:
+            self.wakeup.cancel()
+            self.wakeup = None
+        if pending and len(self):
+            self.wakeup = loop.call_at(min(pending), self._pump)
+
+    async def _send(self, priority, bucket, factory, future, attempts):
+        try:
+            result = await factory()
+        except (discord.HTTPException, discord.RateLimited) as e:
+            retry_after = self._retry_after(e)
+            if retry_after is None or attempts >= self.max_retries:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                scope = None if getattr(e, 'response', None) is not None and e.response.headers.get('X-RateLimit-Global') else bucket
+                self.blocked[scope] = asyncio.get_running_loop().time() + retry_after
+                self.waiting[priority].appendleft((bucket, factory, future, attempts + 1))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            if priority == BACKGROUND:
+                self.background_in_flight -= 1
+            self.busy.discard(bucket)
+            now = asyncio.get_running_loop().time()
+            self.blocked = {scope: until for scope, until in self.blocked.items() if until > now}
+            self._pump()
+
+    def _retry_after(self, e):
+        if isinstance(e, discord.RateLimited):
+            return e.retry_after
+        if e.status != 429:
+            return None
+        try:
+            return float(e.response.headers.get('Retry-After', 1))
+        except (AttributeError, TypeError, ValueError):
+            return 1.0
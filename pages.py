@@ -0,0 +1,21 @@
+# Discord rejects embeds with more than 25 fields or 6000 characters in total.
+EMBED_FIELDS = 25
+EMBED_CHARS = 6000
+
+def paginate(sizes, reserved=0, max_fields=EMBED_FIELDS, max_chars=EMBED_CHARS):
+    # sizes[i] is the character count of field i; reserved covers the title,
+    # footer and anything else every page carries. Returns the index of the
+    # first field on each page.
+    starts = []
+    count = chars = 0
+    for index, size in enumerate(sizes):
+        if not starts or count == max_fields or chars + size > max_chars - reserved:
+            starts.append(index)
+            count = chars = 0
+        count += 1
+        chars += size
+    return starts
+
+def page_bounds(starts, page, total):
+    stop = starts[page + 1] if page + 1 < len(starts) else total
+    return starts[page], stop
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WriteBehindQueue:
+    def __init__(self, apply, delay=0.5):
+        self.apply = apply
+        self.delay = delay
+        self.pending = {}
+        self._handle = None
+        self._inflight = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistence")
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, key, op):
+        # Only the newest op per key survives, moved to the end so ordering
+        # against other keys (e.g. a guild-wide delete) is preserved.
+        self.pending.pop(key, None)
+        self.pending[key] = op
+        if self._handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_now()
+            return
+
+        self._handle = loop.call_later(self.delay, self._flush)
+
+    def _flush(self):
+        self._handle = None
+        # One batch at a time: a failed batch is merged back before anything
+        # newer is applied, so a retry can never land over a later write.
+        if not self.pending or self._inflight is not None:
+            return
+
+        batch = list(self.pending.items())
+        self.pending = {}
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self.apply, [op for _, op in batch])
+        future.add_done_callback(lambda f: self._on_applied(f, batch))
+        self._inflight = future
+
+    async def drain(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._inflight is not None:
+            await asyncio.wait([self._inflight])
+        self._flush()
+        if self._inflight is not None:
+            await asyncio.wait([self._inflight])
+
+    def _on_applied(self, future, batch):
+        self._inflight = None
+        error = future.exception()
+        if error is not None:
+            print(f"Error saving data: {error}")
+            # Ops put since the batch was taken are newer and win; the rest
+            # go back in front of them.
+            retry = {key: op for key, op in batch if key not in self.pending}
+            retry.update(self.pending)
+            self.pending = retry
+
+        if self.pending and self._handle is None:
+            self._handle = asyncio.get_running_loop().call_later(self.delay, self._flush)
+
+    def flush_now(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self.pending:
+            batch = list(self.pending.values())
+            self.pending = {}
+            self.apply(batch)
+
+    def close(self):
+        # Let any in-flight batch land first so the final one is the newest.
+        self._executor.shutdown(wait=True)
+        self.flush_now()
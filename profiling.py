@@ -0,0 +1,103 @@
+import cProfile
+import functools
+import os
+import re
+import time
+from datetime import datetime
+
+import discord
+from discord import app_commands
+
+from metrics import registry
+
+handler_seconds = registry.histogram("dash_handler_seconds", "Wall time of commands and view callbacks while profiling is on.", ("handler",))
+
+class HandlerProfiler:
+    # Installed once around every handler; costs one attribute check until
+    # it's switched on.
+    def __init__(self, enabled=False, cprofile=False, threshold=1.0, directory="profiles", keep=50):
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.threshold = threshold
+        self.directory = directory
+        self.keep = keep
+        self.installed = False
+        # cProfile hooks the whole thread, so only one handler is profiled
+        # at a time; overlapping ones still get their wall time recorded.
+        self.active = None
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return await func(*args, **kwargs)
+            return await self.measure(name, func(*args, **kwargs))
+        return wrapper
+
+    async def measure(self, name, coro):
+        profile = None
+        if self.cprofile and self.active is None:
+            profile = self.active = cProfile.Profile()
+            profile.enable()
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            elapsed = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+                self.active = None
+            handler_seconds.observe(elapsed, name)
+            if elapsed >= self.threshold:
+                self.report(name, elapsed, profile)
+
+    def report(self, name, elapsed, profile):
+        print(f"Slow handler {name}: {elapsed:.3f}s")
+        if profile is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            slug = re.sub(r'[^\w-]+', '_', name).strip('_')
+            path = os.path.join(self.directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{slug}_{int(elapsed * 1000)}ms.prof")
+            profile.dump_stats(path)
+            self.rotate()
+        except Exception as e:
+            print(f"Error saving profile: {e}")
+
+    def rotate(self):
+        files = sorted(name for name in os.listdir(self.directory) if name.endswith('.prof'))
+        for name in files[:-self.keep]:
+            os.remove(os.path.join(self.directory, name))
+
+    def install(self, bot, after_view=None):
+        if self.installed:
+            return
+        self.installed = True
+
+        for command in bot.walk_commands():
+            command.callback = self.wrap(f"!{command.qualified_name}", command.callback)
+
+        # app_commands.Command has no public way to replace its callback.
+        for command in bot.tree.walk_commands():
+            if isinstance(command, app_commands.Command):
+                command._callback = self.wrap(f"/{command.qualified_name}", command._callback)
+
+        # Every button and select callback goes through this one method, so
+        # patching it covers all views, persistent ones included.
+        view_class = getattr(discord.ui.view, 'BaseView', discord.ui.View)
+        scheduled_task = view_class._scheduled_task
+
+        # after_view(interaction) runs once each callback has returned,
+        # whether or not profiling is on.
+        @functools.wraps(scheduled_task)
+        async def profiled_task(view, item, interaction):
+            try:
+                if not self.enabled:
+                    return await scheduled_task(view, item, interaction)
+                name = f"{type(view).__name__}:{getattr(item, 'custom_id', None) or type(item).__name__}"
+                return await self.measure(name, scheduled_task(view, item, interaction))
+            finally:
+                if after_view is not None:
+                    after_view(interaction)
+
+        view_class._scheduled_task = profiled_task
@@ -0,0 +1,33 @@
+import asyncio
+
+from outbound import BRACKET
+
+class EmbedRefresher:
+    def __init__(self, window=2.0, outbound=None):
+        self.window = window
+        self.outbound = outbound
+        self.pending = {}
+        self.tasks = {}
+
+    def schedule(self, message, render):
+        # render is called at send time, so whatever edit goes out carries
+        # the newest state no matter how many clicks were folded into it.
+        self.pending[message.id] = (message, render)
+        if message.id not in self.tasks:
+            self.tasks[message.id] = asyncio.create_task(self._run(message.id))
+
+    async def _run(self, message_id):
+        try:
+            while message_id in self.pending:
+                message, render = self.pending.pop(message_id)
+                try:
+                    embed = render()
+                    if self.outbound is None:
+                        await message.edit(embed=embed)
+                    else:
+                        await self.outbound.run(BRACKET, message.channel.id, lambda: message.edit(embed=embed))
+                except Exception as e:
+                    print(f"Error updating embed: {e}")
+                await asyncio.sleep(self.window)
+        finally:
+            del self.tasks[message_id]
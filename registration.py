@@ -0,0 +1,34 @@
+class Registration:
+    def __init__(self):
+        # entry key (user id in 1v1, team id in 2v2) -> tuple of players,
+        # kept in sign-up order.
+        self.entries = {}
+        self.entry_of = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, user_id):
+        return user_id in self.entry_of
+
+    def entry_key(self, user_id):
+        return self.entry_of.get(user_id)
+
+    def add(self, key, players):
+        players = tuple(players)
+        self.entries[key] = players
+        for player in players:
+            self.entry_of[player.id] = key
+
+    def remove(self, key):
+        players = self.entries.pop(key, ())
+        for player in players:
+            if self.entry_of.get(player.id) == key:
+                del self.entry_of[player.id]
+        return players
+
+    def teams(self):
+        return [list(players) for players in self.entries.values()]
+
+    def players(self):
+        return [player for players in self.entries.values() for player in players]
@@ -0,0 +1,38 @@
+class GuildRenders:
+    # Rendered output is memoized against the tournament's version and
+    # dropped wholesale as soon as the version moves on. Decorated names and
+    # static text outlive versions and are only invalidated explicitly.
+    def __init__(self):
+        self.version = None
+        self.outputs = {}
+        self.names = {}
+        self.static = {}
+
+    def memo(self, version, key, build):
+        if version != self.version:
+            self.version = version
+            self.outputs.clear()
+        value = self.outputs.get(key)
+        if value is None:
+            value = self.outputs[key] = build()
+        return value
+
+    def name(self, player_id, build):
+        name = self.names.get(player_id)
+        if name is None:
+            name = self.names[player_id] = build()
+        return name
+
+    def static_text(self, key, build):
+        # A guild runs one tournament at a time, so only the latest key is kept.
+        if key not in self.static:
+            self.static = {key: build()}
+        return self.static[key]
+
+    def invalidate_names(self, player_id=None):
+        if player_id is None:
+            self.names.clear()
+        else:
+            self.names.pop(player_id, None)
+        self.version = None
+        self.outputs.clear()
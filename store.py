@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+
+from persistence import WriteBehindQueue
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS role_permissions (
+    guild_id INTEGER NOT NULL,
+    permission TEXT NOT NULL,
+    role_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, permission, role_id)
+);
+CREATE TABLE IF NOT EXISTS log_channels (
+    guild_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bracket_roles_messages (
+    guild_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    message_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bracket_roles (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    emojis TEXT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS bracket_roles_user ON bracket_roles (user_id);
+CREATE TABLE IF NOT EXISTS teams (
+    guild_id INTEGER NOT NULL,
+    team_id INTEGER NOT NULL,
+    user1_id INTEGER NOT NULL,
+    user2_id INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, team_id)
+);
+CREATE TABLE IF NOT EXISTS team_sequences (
+    guild_id INTEGER PRIMARY KEY,
+    next_team_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tournament_events (
+    guild_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (guild_id, seq)
+);
+CREATE TABLE IF NOT EXISTS tournament_snapshots (
+    guild_id INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    state TEXT NOT NULL
+);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class StateStore:
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        # Reads happen on the event loop; every write goes through the
+        # worker thread's own connection so WAL lets them run side by side.
+        self.write_conn = connect(path)
+        self.write_conn.executescript(SCHEMA)
+        self.read_conn = connect(path)
+        self.writer = WriteBehindQueue(self._apply, delay)
+
+    def _apply(self, batch):
+        with self.write_conn:
+            for sql, params in batch:
+                self.write_conn.execute(sql, params)
+
+    def close(self):
+        self.writer.close()
+        self.read_conn.close()
+        self.write_conn.close()
+
+    def migrate_json(self, json_path):
+        row = self.read_conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if row or not os.path.exists(json_path):
+            return False
+
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+
+        with self.write_conn:
+            for guild_str, permissions in data.get('role_permissions', {}).items():
+                for permission, role_ids in permissions.items():
+                    self.write_conn.executemany(
+                        "INSERT OR IGNORE INTO role_permissions VALUES (?, ?, ?)",
+                        [(int(guild_str), permission, int(role_id)) for role_id in role_ids]
+                    )
+            for guild_str, channel_id in data.get('log_channels', {}).items():
+                self.write_conn.execute(
+                    "INSERT OR REPLACE INTO log_channels VALUES (?, ?)",
+                    (int(guild_str), int(channel_id))
+                )
+            for guild_str, roles in data.get('bracket_roles', {}).items():
+                self.write_conn.executemany(
+                    "INSERT OR REPLACE INTO bracket_roles VALUES (?, ?, ?)",
+                    [(int(guild_str), int(user_str), json.dumps(emojis)) for user_str, emojis in roles.items()]
+                )
+            self.write_conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_migrated', ?)", (json_path,))
+
+        os.replace(json_path, json_path + '.migrated')
+        return True
+
+    def load_role_permissions(self, guild_id):
+        permissions = {}
+        rows = self.read_conn.execute(
+            "SELECT permission, role_id FROM role_permissions WHERE guild_id = ?", (guild_id,)
+        )
+        for permission, role_id in rows:
+            permissions.setdefault(permission, []).append(role_id)
+        return permissions
+
+    def load_log_channel(self, guild_id):
+        row = self.read_conn.execute(
+            "SELECT channel_id FROM log_channels WHERE guild_id = ?", (guild_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load_bracket_roles(self, guild_id):
+        rows = self.read_conn.execute(
+            "SELECT user_id, emojis FROM bracket_roles WHERE guild_id = ?", (guild_id,)
+        )
+        return {str(user_id): json.loads(emojis) for user_id, emojis in rows}
+
+    def load_bracket_roles_messages(self, guild_id):
+        row = self.read_conn.execute(
+            "SELECT channel_id, message_ids FROM bracket_roles_messages WHERE guild_id = ?", (guild_id,)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set_bracket_roles_messages(self, guild_id, channel_id, message_ids):
+        self.writer.put(
+            ('bracket_roles_messages', guild_id),
+            ("INSERT OR REPLACE INTO bracket_roles_messages VALUES (?, ?, ?)", (guild_id, channel_id, json.dumps(message_ids)))
+        )
+
+    def set_log_channel(self, guild_id, channel_id):
+        self.writer.put(
+            ('log_channels', guild_id),
+            ("INSERT OR REPLACE INTO log_channels VALUES (?, ?)", (guild_id, channel_id))
+        )
+
+    def set_bracket_role(self, guild_id, user_id, emojis):
+        self.writer.put(
+            ('bracket_roles', guild_id, user_id),
+            ("INSERT OR REPLACE INTO bracket_roles VALUES (?, ?, ?)", (guild_id, user_id, json.dumps(emojis)))
+        )
+
+    def delete_bracket_role(self, guild_id, user_id):
+        self.writer.put(
+            ('bracket_roles', guild_id, user_id),
+            ("DELETE FROM bracket_roles WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+        )
+
+    def clear_bracket_roles(self, guild_id):
+        self.writer.put(
+            ('bracket_roles', guild_id),
+            ("DELETE FROM bracket_roles WHERE guild_id = ?", (guild_id,))
+        )
+
+    def load_teams(self, guild_id):
+        rows = self.read_conn.execute(
+            "SELECT team_id, user1_id, user2_id FROM teams WHERE guild_id = ?", (guild_id,)
+        )
+        teams = [(team_id, (user1_id, user2_id)) for team_id, user1_id, user2_id in rows]
+        row = self.read_conn.execute(
+            "SELECT next_team_id FROM team_sequences WHERE guild_id = ?", (guild_id,)
+        ).fetchone()
+        return teams, row[0] if row else 1
+
+    def save_team(self, guild_id, team_id, user_ids, next_team_id):
+        self.writer.put(
+            ('teams', guild_id, team_id),
+            ("INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?)", (guild_id, team_id, *user_ids))
+        )
+        self.writer.put(
+            ('team_sequences', guild_id),
+            ("INSERT OR REPLACE INTO team_sequences VALUES (?, ?)", (guild_id, next_team_id))
+        )
+
+    def delete_team(self, guild_id, team_id):
+        self.writer.put(
+            ('teams', guild_id, team_id),
+            ("DELETE FROM teams WHERE guild_id = ? AND team_id = ?", (guild_id, team_id))
+        )
+
+    def load_tournament_journal(self, guild_id):
+        snapshot = self.read_conn.execute(
+            "SELECT seq, state FROM tournament_snapshots WHERE guild_id = ?", (guild_id,)
+        ).fetchone()
+        events = self.read_conn.execute(
+            "SELECT seq, event, payload FROM tournament_events WHERE guild_id = ? AND seq > ? ORDER BY seq",
+            (guild_id, snapshot[0] if snapshot else 0)
+        ).fetchall()
+        return snapshot, events
+
+    def append_tournament_event(self, guild_id, seq, event, payload):
+        self.writer.put(
+            ('tournament_events', guild_id, seq),
+            ("INSERT OR REPLACE INTO tournament_events VALUES (?, ?, ?, ?)", (guild_id, seq, event, payload))
+        )
+
+    def save_tournament_snapshot(self, guild_id, seq, state):
+        self.writer.put(
+            ('tournament_snapshots', guild_id),
+            ("INSERT OR REPLACE INTO tournament_snapshots VALUES (?, ?, ?)", (guild_id, seq, state))
+        )
+        self.writer.put(
+            ('tournament_compact', guild_id),
+            ("DELETE FROM tournament_events WHERE guild_id = ? AND seq <= ?", (guild_id, seq))
+        )
+
+    def clear_tournament(self, guild_id):
+        self.writer.put(
+            ('tournament_clear_events', guild_id),
+            ("DELETE FROM tournament_events WHERE guild_id = ?", (guild_id,))
+        )
+        self.writer.put(
+            ('tournament_clear_snapshot', guild_id),
+            ("DELETE FROM tournament_snapshots WHERE guild_id = ?", (guild_id,))
+        )
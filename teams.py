@@ -0,0 +1,55 @@
+class TeamRegistry:
+    def __init__(self, teams=(), next_team_id=1):
+        self.teams = {}
+        self.player_team = {}
+        self.invitations = {}
+        self.next_team_id = next_team_id
+        for team_id, user_ids in teams:
+            self._add(team_id, tuple(user_ids))
+
+    def __len__(self):
+        return len(self.teams)
+
+    def _add(self, team_id, user_ids):
+        self.teams[team_id] = user_ids
+        for user_id in user_ids:
+            self.player_team[user_id] = team_id
+        # Ids are never reused, even after the newest team is removed.
+        self.next_team_id = max(self.next_team_id, team_id + 1)
+
+    def team_of(self, user_id):
+        return self.player_team.get(user_id)
+
+    def members(self, team_id):
+        return self.teams.get(team_id, ())
+
+    def teammate(self, user_id):
+        for member_id in self.members(self.team_of(user_id)):
+            if member_id != user_id:
+                return member_id
+        return None
+
+    def create(self, user1_id, user2_id):
+        team_id = self.next_team_id
+        self._add(team_id, (user1_id, user2_id))
+        return team_id
+
+    def remove(self, team_id):
+        for user_id in self.teams.pop(team_id, ()):
+            if self.player_team.get(user_id) == team_id:
+                del self.player_team[user_id]
+
+    def invite(self, inviter_id, invitee_id):
+        inviters = self.invitations.setdefault(invitee_id, set())
+        if inviter_id in inviters:
+            return False
+        inviters.add(inviter_id)
+        return True
+
+    def clear_invitation(self, inviter_id, invitee_id):
+        inviters = self.invitations.get(invitee_id)
+        if inviters is None:
+            return
+        inviters.discard(inviter_id)
+        if not inviters:
+            del self.invitations[invitee_id]
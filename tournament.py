@@ -0,0 +1,90 @@
+from itertools import count
+
+from registration import Registration
+from bracket import Bracket
+
+SETTINGS = (
+    'max_players', 'mode', 'channel', 'target_channel', 'title', 'map', 'abilities',
+    'prize_1st', 'prize_2nd', 'prize_3rd', 'prize_4th'
+)
+
+# Process-wide so a reset tournament never reuses a version an earlier one
+# already rendered under.
+VERSIONS = count(1)
+
+class Tournament:
+    def __init__(self):
+        self.version = next(VERSIONS)
+        self.registration = Registration()
+        self.players = []
+        self.max_players = 0
+        self.active = False
+        self.channel = None
+        self.target_channel = None
+        self.message = None
+        self.bracket = None
+        # Messages carrying the current round's announcement, one per page.
+        self.page_round = 0
+        self.page_starts = []
+        self.page_messages = []
+        self.page_image = False
+        # [round, match index, code] for every room code handed out.
+        self.room_codes = []
+        self.fake_count = 1
+        self.map = ""
+        self.abilities = ""
+        self.prize_1st = ""
+        self.prize_2nd = ""
+        self.prize_3rd = ""
+        self.prize_4th = ""
+        self.title = ""
+        self.mode = "1v1"
+
+    def apply(self, event, data):
+        # Live commands and journal replay both go through here, so a
+        # recovered tournament ends up exactly where the live one was.
+        if event == 'created':
+            self.__init__()
+            for name in SETTINGS:
+                setattr(self, name, data[name])
+        elif event == 'message':
+            self.message = data['message']
+        elif event == 'registered':
+            for key, players in data['entries']:
+                self.registration.add(key, players)
+            self.fake_count = data.get('fake_count', self.fake_count)
+        elif event == 'unregistered':
+            for key in data['keys']:
+                self.registration.remove(key)
+        elif event == 'started':
+            self.bracket = Bracket(data['entrants'])
+            self.players = [player for entry in data['entrants'] for player in (entry if isinstance(entry, list) else [entry])]
+            self.fake_count = data['fake_count']
+            self.active = True
+        elif event == 'pages':
+            self.page_round = data['round']
+            self.page_starts = data['starts']
+            self.page_messages = data['messages']
+            self.page_image = data.get('image', False)
+        elif event == 'codes':
+            self.room_codes.extend([data['round'], index, code] for index, code in data['codes'])
+        elif event == 'winner':
+            self.bracket.report(data['player_id'])
+        elif event == 'reset':
+            self.__init__()
+        else:
+            raise ValueError(f"Unknown tournament event: {event}")
+        self.version = next(VERSIONS)
+
+class FakePlayer:
+    def __init__(self, name, user_id):
+        self.display_name = name
+        self.id = user_id
+        self.name = name
+        self.nick = None
+
+    def __eq__(self, other):
+        return isinstance(other, FakePlayer) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)